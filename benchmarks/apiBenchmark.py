@@ -0,0 +1,211 @@
+"""
+this script measures the p50 and p99 latencies of every route of the prediction api under concurrent load
+the api is served by uvicorn in its own process and scrapes the accounts from the local fixture server,
+it is restarted before every route so no route is measured with the caches filled by the routes measured before it
+the results are printed in a json format
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+import requests
+import profileFixtures
+import fixtureServer
+import benchmarkUtils
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def serve_api(port: int, fixture_url: str, requests_per_second: float):
+    """
+    this function serves the prediction api with uvicorn, scraping the accounts from the fixture server.
+    it runs in its own process so the clients of the benchmark never compete with the api for the GIL
+
+    Parameters
+    ----------
+    port : int
+        the local port of the api.
+    fixture_url : str
+        the base url of the profiles served by the fixture server.
+    requests_per_second : float
+        the rate limit of the requests sent to the fixture server.
+
+    Returns
+    -------
+    None.
+
+    """
+    import uvicorn
+    profileFixtures.use_scripts_directory()
+    benchmarkUtils.use_fixture_server(fixture_url, requests_per_second)
+    import predictionApi
+    uvicorn.run(predictionApi.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_api_server(fixture_url: str, requests_per_second: float) -> tuple:
+    """
+    this function starts the prediction api in a new process on a free local port and waits until it answers
+
+    Parameters
+    ----------
+    fixture_url : str
+        the base url of the profiles served by the fixture server.
+    requests_per_second : float
+        the rate limit of the requests sent to the fixture server.
+
+    Returns
+    -------
+    tuple
+        the api process and the base url of the api.
+
+    """
+    #reserve a free port for uvicorn
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        port = free_socket.getsockname()[1]
+    api_process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port), "--fixture-url", fixture_url, "--requests-per-second", str(requests_per_second)])
+    api_url = "http://127.0.0.1:" + str(port)
+    while True:
+        if api_process.poll() is not None:
+            raise RuntimeError("the api process stopped before answering")
+        try:
+            requests.get(api_url + "/", timeout=1)
+            return api_process, api_url
+        except requests.ConnectionError:
+            time.sleep(0.1)
+
+
+def get_api_routes(accounts: list) -> list:
+    """
+    this function returns the requests sent to every route of the api, the user ids and the descriptions are taken from the accounts of the fixture server
+
+    Parameters
+    ----------
+    accounts : list
+        the accounts served by the fixture server.
+
+    Returns
+    -------
+    list
+        list of the (route name, function returning the method, path and json body of the request number i) tuples.
+
+    """
+    user_ids = [account_data["medium"] for account_data in accounts]
+    descriptions = [account_data["description"] for account_data in accounts]
+    return [("GET /", lambda i: ("GET", "/", None)),
+            ("GET /routes", lambda i: ("GET", "/routes", None)),
+            ("GET /modelInfo", lambda i: ("GET", "/modelInfo", None)),
+            ("GET /cacheStats", lambda i: ("GET", "/cacheStats", None)),
+            ("GET /metrics", lambda i: ("GET", "/metrics", None)),
+            ("GET /checkTrainingData/{user_id}", lambda i: ("GET", "/checkTrainingData/" + user_ids[i % len(user_ids)], None)),
+            ("POST /checkTrainingData", lambda i: ("POST", "/checkTrainingData", {"user_ids": user_ids[i % len(user_ids):][:20]})),
+            ("POST /predictBatch", lambda i: ("POST", "/predictBatch", {"descriptions": descriptions[i % len(descriptions):][:20], "with_probability": True})),
+            ("GET /predictMediumUser/{user_id}", lambda i: ("GET", "/predictMediumUser/" + user_ids[i % len(user_ids)], None)),
+            ("GET /predictUsersStartingWith/{user_id}/10", lambda i: ("GET", "/predictUsersStartingWith/" + user_ids[i % len(user_ids)] + "/10", None)),
+            ("GET /predictUsersStartingWith/{user_id}/10?stream=ndjson", lambda i: ("GET", "/predictUsersStartingWith/" + user_ids[i % len(user_ids)] + "/10?stream=ndjson", None))]
+
+
+def benchmark_route(api_url: str, build_request, number_of_requests: int, concurrency: int) -> dict:
+    """
+    this function sends number_of_requests requests to a route of the api from concurrency clients and measures their latency
+
+    Parameters
+    ----------
+    api_url : str
+        the base url of the api.
+    build_request : TYPE
+        function returning the method, the path and the json body of the request number i.
+    number_of_requests : int
+        the number of requests sent to the route.
+    concurrency : int
+        the number of clients sending requests at the same time.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the requests answered per second, the number of errors and the latency of the requests.
+
+    """
+    #every client thread keeps its own keep-alive session
+    thread_data = threading.local()
+
+    def send_request(request_number: int) -> tuple:
+        if not hasattr(thread_data, "session"):
+            thread_data.session = requests.Session()
+        method, path, body = build_request(request_number)
+        start_time = time.perf_counter()
+        response = thread_data.session.request(method, api_url + path, json=body)
+        #read the whole body so the streamed responses are measured until their last account
+        response.content
+        return time.perf_counter() - start_time, response.status_code
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(send_request, range(number_of_requests)))
+    duration = time.perf_counter() - start_time
+    return {"requests_per_second": number_of_requests / duration,
+            "errors": sum(1 for _, status_code in results if status_code != 200),
+            "latency": benchmarkUtils.summarize_latencies([latency for latency, _ in results])}
+
+
+def run_api_benchmark(number_of_requests: int = 200, concurrency: int = 8, latency_seconds: float = 0.02, requests_per_second: float = 1000.0) -> dict:
+    """
+    this function starts the fixture server and measures the latency of every route with a new api process.
+    every route starts with empty caches, the first requests of the scraping routes download the pages and the next ones mostly use the profile cache
+
+    Parameters
+    ----------
+    number_of_requests : int, optional
+        the number of requests sent to every route. The default is 200.
+    concurrency : int, optional
+        the number of clients sending requests at the same time. The default is 8.
+    latency_seconds : float, optional
+        the delay of the fixture server before every answer. The default is 0.02.
+    requests_per_second : float, optional
+        the rate limit of the requests sent to the fixture server. The default is 1000.0.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the parameters and the results of every route.
+
+    """
+    profileFixtures.use_scripts_directory()
+    fixture_server = fixtureServer.start_fixture_server(latency_seconds)
+    routes = dict()
+    try:
+        for route_name, build_request in get_api_routes(fixture_server.accounts):
+            api_process, api_url = start_api_server(fixture_server.base_url, requests_per_second)
+            try:
+                routes[route_name] = benchmark_route(api_url, build_request, number_of_requests, concurrency)
+            finally:
+                #uvicorn raises the signal again once it has stopped, SIGINT ends the process with a KeyboardInterrupt so its temporary log directory is deleted
+                api_process.send_signal(signal.SIGINT)
+                api_process.wait()
+    finally:
+        fixture_server.shutdown()
+    return {"requests_per_route": number_of_requests,
+            "concurrency": concurrency,
+            "server_latency_seconds": latency_seconds,
+            "routes": routes}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="measure the latency of every route of the prediction api under load")
+    argument_parser.add_argument("--requests", type=int, default=200, help="number of requests sent to every route")
+    argument_parser.add_argument("--concurrency", type=int, default=8, help="number of clients sending requests at the same time")
+    argument_parser.add_argument("--latency", type=float, default=0.02, help="delay in seconds of the fixture server before every answer")
+    argument_parser.add_argument("--requests-per-second", type=float, default=1000.0, help="rate limit of the requests sent to the fixture server")
+    #options used by start_api_server to serve the api in its own process
+    argument_parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    argument_parser.add_argument("--fixture-url", help=argparse.SUPPRESS)
+    arguments = argument_parser.parse_args()
+    if arguments.serve is not None:
+        serve_api(arguments.serve, arguments.fixture_url, arguments.requests_per_second)
+        sys.exit()
+    print(json.dumps(run_api_benchmark(arguments.requests, arguments.concurrency, arguments.latency, arguments.requests_per_second), indent=4))
@@ -0,0 +1,120 @@
+"""
+this script contains the helpers shared by the benchmarks: the latency statistics, the configuration of the scraper to crawl the fixture server
+and the temporary log file written instead of logs/LogFile.log
+"""
+import os
+import math
+import tempfile
+
+#directory of the log file of the scripts run by the benchmarks, created on first use and deleted when the process exits
+temporary_log_directory = None
+
+
+def get_percentile(sorted_values: list, percentile: float) -> float:
+    """
+    this function returns a percentile of sorted values with the nearest rank method
+
+    Parameters
+    ----------
+    sorted_values : list
+        the values sorted in increasing order.
+    percentile : float
+        the percentile between 0 and 100.
+
+    Returns
+    -------
+    float
+        the value of the percentile.
+
+    """
+    rank = max(1, math.ceil(percentile / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: list) -> dict:
+    """
+    this function summarizes latencies measured in seconds
+
+    Parameters
+    ----------
+    latencies : list
+        the measured latencies in seconds.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the number of measures and the mean, p50, p99 and max latencies in milliseconds.
+
+    """
+    sorted_latencies = sorted(latencies)
+    return {"count": len(sorted_latencies),
+            "mean_ms": 1000 * sum(sorted_latencies) / len(sorted_latencies),
+            "p50_ms": 1000 * get_percentile(sorted_latencies, 50),
+            "p99_ms": 1000 * get_percentile(sorted_latencies, 99),
+            "max_ms": 1000 * sorted_latencies[-1]}
+
+
+def use_temporary_log_file() -> str:
+    """
+    this function points the log file of the scripts to a temporary file so running the benchmarks does not add lines to the tracked logs/LogFile.log.
+    the log file is opened by the first decorated function called so this function must run before it, its directory is deleted when the process exits
+
+    Returns
+    -------
+    str
+        the path of the temporary log file.
+
+    """
+    global temporary_log_directory
+    import constants
+    if temporary_log_directory is None:
+        temporary_log_directory = tempfile.TemporaryDirectory(prefix="benchmarks-")
+    constants.LOGFILE_DIR = os.path.join(temporary_log_directory.name, "LogFile.log")
+    return constants.LOGFILE_DIR
+
+
+def use_fixture_server(base_url: str, requests_per_second: float):
+    """
+    this function points the scraper to the fixture server and sets the rate limit of the crawler.
+    the on-disk profile cache is disabled so every benchmark starts from the same state and the logs are written to a temporary file
+
+    Parameters
+    ----------
+    base_url : str
+        the base url of the profiles served by the fixture server.
+    requests_per_second : float
+        the rate limit of the requests sent to the fixture server.
+
+    Returns
+    -------
+    None.
+
+    """
+    import constants
+    import httpClient
+    constants.MEDIUM_URL = base_url
+    constants.CRAWLER_REQUESTS_PER_SECOND = requests_per_second
+    constants.CRAWLER_BURST_SIZE = max(constants.CRAWLER_BURST_SIZE, int(requests_per_second))
+    constants.PROFILE_CACHE_DB = None
+    use_temporary_log_file()
+    #the token buckets are created with the rate limit of the constants on the first request to a host
+    with httpClient.host_buckets_lock:
+        httpClient.host_buckets.clear()
+    reset_scraper_caches()
+
+
+def reset_scraper_caches():
+    """
+    this function empties the profile cache, the pages kept for the conditional requests and the prediction memo
+
+    Returns
+    -------
+    None.
+
+    """
+    import httpClient
+    import profileCache
+    import modelRegistry
+    profileCache.memory_cache.clear()
+    httpClient.clear_conditional_cache()
+    modelRegistry.prediction_cache.clear()
@@ -0,0 +1,119 @@
+"""
+this script contains the local http server serving the fixture profile pages so the scraper and the crawler can be benchmarked offline
+the served accounts are the crawled accounts and the testing accounts of the data folder, each one following 5 other served accounts.
+the server can also answer some requests with 429 or 5xx errors and serve some pages slowly to check the retries and the crawl workers
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import profileFixtures
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+#number of accounts followed by every served account
+NUMBER_OF_FOLLOWING = 5
+
+
+def load_served_accounts() -> list:
+    """
+    this function loads the accounts served by the fixture server and links them so every account follows 5 other served accounts
+
+    Returns
+    -------
+    list
+        the data of the served accounts.
+
+    """
+    served_accounts = []
+    for data_file in ("accounts_data.json", "accounts_testing_data.json"):
+        with open(os.path.join(profileFixtures.BENCHMARKS_DIR, "..", "data", data_file), "r", encoding="utf-8") as file:
+            served_accounts.extend(json.loads(file.read()))
+    #keep one version of every account
+    served_accounts = list({account_data["medium"]: account_data for account_data in served_accounts}.values())
+    user_ids = [account_data["medium"] for account_data in served_accounts]
+    for index, account_data in enumerate(served_accounts):
+        account_data["following_top_5"] = [user_ids[(index * 7 + offset + 1) % len(user_ids)] for offset in range(NUMBER_OF_FOLLOWING)]
+    return served_accounts
+
+
+class FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    request handler serving the page of the account of the path /@user_id with an ETag, answering 304 to the matching conditional requests.
+    the error statuses queued in server.failures for a user id are sent first, with the Retry-After header of server.retry_after
+    """
+    protocol_version = "HTTP/1.1"
+    #the headers and the page are sent in two writes, without this the second write waits for the delayed ack of the client
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        user_id = self.path.split("@", 1)[-1].split("?")[0]
+        with self.server.state_lock:
+            queued_failures = self.server.failures.get(user_id)
+            failure_status = queued_failures.pop(0) if queued_failures else None
+            self.server.request_log.append((user_id, time.monotonic(), failure_status))
+        #wait like a remote server would before answering
+        time.sleep(self.server.latency_seconds + self.server.slow_pages.get(user_id, 0.0))
+        if failure_status is not None:
+            self.send_response(failure_status)
+            if self.server.retry_after is not None:
+                self.send_header("Retry-After", str(self.server.retry_after))
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        page = self.server.pages.get(user_id)
+        if page is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = '"' + hashlib.sha1(page).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
+
+    def log_message(self, format, *args):
+        #the requests are not printed so the benchmark output stays readable
+        pass
+
+
+def start_fixture_server(latency_seconds: float = 0.0) -> ThreadingHTTPServer:
+    """
+    this function starts the fixture server on a free local port in a background thread
+
+    Parameters
+    ----------
+    latency_seconds : float, optional
+        the delay added before answering every request to simulate the network. The default is 0.0.
+
+    Returns
+    -------
+    ThreadingHTTPServer
+        the running server, its base_url attribute is the value to use as constants.MEDIUM_URL.
+        the error statuses to send before the page of a user id are added to its failures dictionnary, the extra delays of the slow pages
+        to its slow_pages dictionnary, and every request is recorded in its request_log list as (user_id, time, error status or None).
+
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureRequestHandler)
+    server.daemon_threads = True
+    server.latency_seconds = latency_seconds
+    server.base_url = "http://127.0.0.1:" + str(server.server_port) + "/@"
+    server.accounts = load_served_accounts()
+    server.pages = {account_data["medium"]: profileFixtures.render_profile_page(account_data, server.base_url).encode("utf-8") for account_data in server.accounts}
+    server.failures = dict()
+    server.retry_after = None
+    server.slow_pages = dict()
+    server.request_log = []
+    server.state_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,104 @@
+"""
+this script measures the number of profile pages parsed per second by every parser backend on the offline fixture pages
+the results are printed in a json format
+"""
+import json
+import time
+import argparse
+import profileFixtures
+
+
+def benchmark_parser(parser_backend: str, pages: dict, number_of_rounds: int) -> dict:
+    """
+    this function parses all the fixture pages number_of_rounds times with a parser backend and measures its throughput
+
+    Parameters
+    ----------
+    parser_backend : str
+        "lxml" or "bs4".
+    pages : dict
+        the html of the fixture pages keyed by user id.
+    number_of_rounds : int
+        the number of times every page is parsed.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the number of pages parsed, the duration and the pages parsed per second.
+
+    """
+    import pageParser
+    start_time = time.perf_counter()
+    for _ in range(number_of_rounds):
+        for user_id, page in pages.items():
+            pageParser.parse_medium_page(page, user_id, "https://medium.com/@" + user_id, parser_backend)
+    duration = time.perf_counter() - start_time
+    number_of_pages = number_of_rounds * len(pages)
+    return {"backend": parser_backend, "pages": number_of_pages, "seconds": duration, "pages_per_second": number_of_pages / duration}
+
+
+def check_page_encodings(parser_backends: list) -> list:
+    """
+    this function checks every parser backend decodes the non ascii texts of a page without charset meta tag,
+    when the server sends no charset and when the charset of the Content-Type header is not utf-8
+
+    Parameters
+    ----------
+    parser_backends : list
+        the parser backends to check.
+
+    Returns
+    -------
+    list
+        list of the checked (encoding of the page, charset sent by the server) tuples.
+
+    """
+    import pageParser
+    account_data = {"medium": "zoecafe", "name": "Zoë Café", "num_followers": 1200, "following_top_5": ["ada", "bob"],
+                    "description": "Écrivain — naïve 😀", "links_of_description": []}
+    page = profileFixtures.render_profile_page(account_data).replace('<meta charset="utf-8">', '')
+    checked_encodings = []
+    for page_encoding, server_charset in (("utf-8", None), ("utf-8", "utf-8"), ("iso-8859-1", "iso-8859-1")):
+        expected_texts = [text.encode(page_encoding, "replace").decode(page_encoding) for text in (account_data["name"], account_data["description"])]
+        for parser_backend in parser_backends:
+            parsed_page = pageParser.parse_medium_page(page.encode(page_encoding, "replace"), account_data["medium"], "https://medium.com/@" + account_data["medium"], parser_backend, server_charset)
+            if [parsed_page["name"], parsed_page["description"]] != expected_texts:
+                raise ValueError("the " + parser_backend + " backend decoded the " + page_encoding + " page without charset meta tag as " + repr([parsed_page["name"], parsed_page["description"]]))
+        checked_encodings.append((page_encoding, server_charset))
+    return checked_encodings
+
+
+def run_parser_benchmark(number_of_rounds: int = 50) -> dict:
+    """
+    this function benchmarks every available parser backend after checking they extract the same data from the fixtures and decode the pages without charset meta tag
+
+    Parameters
+    ----------
+    number_of_rounds : int, optional
+        the number of times every page is parsed by every backend. The default is 50.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the selectors version and the results of every backend.
+
+    """
+    profileFixtures.use_scripts_directory()
+    import constants
+    import pageParser
+    pages = profileFixtures.load_fixture_pages()
+    parser_backends = ["bs4"] + (["lxml"] if pageParser.lxml is not None else [])
+    for user_id, page in pages.items():
+        parsed_pages = [pageParser.parse_medium_page(page, user_id, "https://medium.com/@" + user_id, parser_backend) for parser_backend in parser_backends]
+        if any(parsed_page != parsed_pages[0] for parsed_page in parsed_pages):
+            raise ValueError("the parser backends extracted different data from the fixture page of " + user_id)
+    return {"selectors_version": constants.PAGE_SELECTORS_VERSION,
+            "checked_encodings": check_page_encodings(parser_backends),
+            "results": [benchmark_parser(parser_backend, pages, number_of_rounds) for parser_backend in parser_backends]}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="measure the pages parsed per second by every parser backend")
+    argument_parser.add_argument("--rounds", type=int, default=50, help="number of times every fixture page is parsed")
+    arguments = argument_parser.parse_args()
+    print(json.dumps(run_parser_benchmark(arguments.rounds), indent=4))
@@ -0,0 +1,126 @@
+"""
+this script measures the latency of the predictions made one description at a time with predict_medium_account
+and for a whole batch of descriptions with predict_medium_accounts, with an empty prediction memo and with the memo filled
+the results are printed in a json format
+"""
+import os
+import json
+import time
+import argparse
+import profileFixtures
+import benchmarkUtils
+
+
+def load_descriptions() -> list:
+    """
+    this function loads the distinct descriptions of the testing dataset
+
+    Returns
+    -------
+    list
+        the descriptions.
+
+    """
+    with open(os.path.join(profileFixtures.BENCHMARKS_DIR, "..", "data", "accounts_testing_data.json"), "r", encoding="utf-8") as file:
+        return list(dict.fromkeys(account_data["description"] for account_data in json.loads(file.read())))
+
+
+def benchmark_single_predictions(descriptions: list, number_of_rounds: int) -> dict:
+    """
+    this function predicts the descriptions one by one with predict_medium_account, emptying the prediction memo before every round
+
+    Parameters
+    ----------
+    descriptions : list
+        the descriptions to predict.
+    number_of_rounds : int
+        the number of times every description is predicted.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the descriptions predicted per second and the latency of every prediction.
+
+    """
+    import mediumScraper
+    latencies = []
+    for _ in range(number_of_rounds):
+        benchmarkUtils.reset_scraper_caches()
+        for description in descriptions:
+            start_time = time.perf_counter()
+            mediumScraper.predict_medium_account(None, description)
+            latencies.append(time.perf_counter() - start_time)
+    return {"descriptions_per_second": len(latencies) / sum(latencies), "latency": benchmarkUtils.summarize_latencies(latencies)}
+
+
+def benchmark_batch_predictions(descriptions: list, number_of_rounds: int, use_memo: bool) -> dict:
+    """
+    this function predicts all the descriptions in one call of predict_medium_accounts
+
+    Parameters
+    ----------
+    descriptions : list
+        the descriptions to predict.
+    number_of_rounds : int
+        the number of batches predicted.
+    use_memo : bool
+        False to empty the prediction memo before every batch, True to predict the batches with the memo filled by a first batch.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the batch size, the descriptions predicted per second and the latency of every batch.
+
+    """
+    import mediumScraper
+    benchmarkUtils.reset_scraper_caches()
+    if use_memo:
+        mediumScraper.predict_medium_accounts(descriptions)
+    latencies = []
+    for _ in range(number_of_rounds):
+        if not use_memo:
+            benchmarkUtils.reset_scraper_caches()
+        start_time = time.perf_counter()
+        mediumScraper.predict_medium_accounts(descriptions)
+        latencies.append(time.perf_counter() - start_time)
+    return {"batch_size": len(descriptions), "descriptions_per_second": len(descriptions) * len(latencies) / sum(latencies), "latency": benchmarkUtils.summarize_latencies(latencies)}
+
+
+def run_prediction_benchmark(number_of_rounds: int = 20) -> dict:
+    """
+    this function runs the prediction benchmarks on the descriptions of the testing dataset after checking the single and the batch predictions are the same
+
+    Parameters
+    ----------
+    number_of_rounds : int, optional
+        the number of times every description is predicted in every mode. The default is 20.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the model version and the results of the single predictions, the batch predictions and the memoized batch predictions.
+
+    """
+    profileFixtures.use_scripts_directory()
+    benchmarkUtils.use_temporary_log_file()
+    import mediumScraper
+    import modelRegistry
+    descriptions = load_descriptions()
+    #load the model before the measures so the first prediction does not include the unpickling
+    model_version = modelRegistry.load_versioned_model()[2]
+    benchmarkUtils.reset_scraper_caches()
+    batch_predictions = mediumScraper.predict_medium_accounts(descriptions)
+    benchmarkUtils.reset_scraper_caches()
+    if [mediumScraper.predict_medium_account(None, description) for description in descriptions] != batch_predictions:
+        raise ValueError("the single and the batch predictions are different")
+    return {"model_version": model_version,
+            "single": benchmark_single_predictions(descriptions, number_of_rounds),
+            "batch": benchmark_batch_predictions(descriptions, number_of_rounds, use_memo=False),
+            "memoized_batch": benchmark_batch_predictions(descriptions, number_of_rounds, use_memo=True)}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="measure the latency of the single and the batch predictions")
+    argument_parser.add_argument("--rounds", type=int, default=20, help="number of times every description is predicted in every mode")
+    arguments = argument_parser.parse_args()
+    print(json.dumps(run_prediction_benchmark(arguments.rounds), indent=4))
@@ -0,0 +1,151 @@
+"""
+this script contains the offline profile page fixtures used by the benchmarks
+the fixture pages follow the layout described by the selectors of constants.PAGE_SELECTORS and are rendered from the accounts of the labeled datasets,
+they can be replaced by live pages with record_fixture_pages when the medium layout and the selectors change
+"""
+import os
+import sys
+import html
+
+from string import Template
+
+#directories of the benchmarks, of their fixtures and of the project scripts
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARKS_DIR, "fixtures")
+PROFILES_DIR = os.path.join(FIXTURES_DIR, "profiles")
+SCRIPTS_DIR = os.path.join(BENCHMARKS_DIR, "..", "scripts")
+
+#class of the links to the followed accounts, the same as the following_link selector
+FOLLOWING_LINK_CLASS = "au av aw ax ay az ba bb bc bd be bf bg bh bi"
+
+
+def use_scripts_directory():
+    """
+    this function makes the project scripts importable and moves to their directory because the paths of constants.py are relative to it
+
+    Returns
+    -------
+    None.
+
+    """
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    os.chdir(SCRIPTS_DIR)
+
+
+def format_followers(num_followers: int) -> str:
+    """
+    this function formats a number of followers the way medium displays it, like 14K or 1.2M
+
+    Parameters
+    ----------
+    num_followers : int
+        the number of followers.
+
+    Returns
+    -------
+    str
+        the formatted number of followers.
+
+    """
+    if num_followers >= 1000000:
+        return ("%.1f" % (num_followers / 1000000)).replace(".0", "") + "M"
+    if num_followers >= 1000:
+        return ("%.1f" % (num_followers / 1000)).replace(".0", "") + "K"
+    return str(num_followers)
+
+
+def render_profile_page(account_data: dict, base_url: str = "https://medium.com/@") -> str:
+    """
+    this function renders the html profile page of an account with the fixture template
+
+    Parameters
+    ----------
+    account_data : dict
+        the data of the account like the accounts of the labeled datasets.
+    base_url : str, optional
+        the base url of the profile links. The default is "https://medium.com/@".
+
+    Returns
+    -------
+    str
+        the html of the profile page.
+
+    """
+    with open(os.path.join(FIXTURES_DIR, "profile_page_template.html"), "r", encoding="utf-8") as file:
+        template = Template(file.read())
+
+    name = html.escape(account_data["name"])
+    #articles of the main section of the page, outside of the user data section
+    articles = "".join('<article class="gl gm gn"><div class="go gp"><a href="' + base_url + account_data["medium"] + '/story-' + str(index) + '"><h2 class="gq gr">Story number ' + str(index) + ' by ' + name + '</h2></a>'
+                       '<p class="gs gt">A preview of the story that is displayed on the profile page of the writer, long enough to look like a real preview of a medium story.</p>'
+                       '<div class="gu gv"><span>5 min read</span><span>Mar ' + str(index + 1) + '</span><button aria-label="Save">Save</button></div></div></article>' for index in range(10))
+
+    #description with its links, omitted when the account has no description
+    description = ""
+    if account_data["description"]:
+        description = html.escape(account_data["description"])
+        for link in account_data.get("links_of_description", []):
+            link_tag = '<a href="' + html.escape(link) + '">' + html.escape(link) + '</a>'
+            #the links written in the description become anchors, the other links are added at the end of the description
+            description = description.replace(html.escape(link), link_tag, 1) if html.escape(link) in description else description + " " + link_tag
+
+    #following section with the top 5 following accounts and the see all link
+    following = ""
+    if account_data["following_top_5"]:
+        following_links = "".join('<a class="' + FOLLOWING_LINK_CLASS + '" href="' + (("https://" + user_id + ".medium.com/?source=follow_footer") if index % 4 == 3 else (base_url + user_id + "?source=follow_footer")) + '">'
+                                  '<div class="gw"><img alt="" class="gx" src="https://miro.medium.com/fit/c/40/40/1*follow.png"></div><div class="gy"><h4 class="gz">' + html.escape(user_id) + '</h4></div></a>'
+                                  for index, user_id in enumerate(account_data["following_top_5"]))
+        following = ('<div class="fv fw"><h2 class="fx">Following</h2>' + following_links +
+                     '<a class="' + FOLLOWING_LINK_CLASS + '" href="' + base_url + account_data["medium"] + '/following?source=follow_footer"><p class="ha">See all (' + str(len(account_data["following_top_5"]) * 7) + ')</p></a></div>')
+
+    page = template.substitute(name=name, followers=format_followers(account_data["num_followers"]), articles=articles, following=following, description=description)
+    if not description:
+        #remove the empty description paragraph so the next paragraph of the section takes its place like on medium
+        page = page.replace('<div class="fg fh"><p class="fi fj fk fl fm fn fo"></p></div>\n', '')
+    return page
+
+
+def load_fixture_pages() -> dict:
+    """
+    this function loads the html of the fixture profile pages
+
+    Returns
+    -------
+    dict
+        dictionnary of the html of every fixture page as bytes keyed by the user id.
+
+    """
+    pages = dict()
+    for file_name in sorted(os.listdir(PROFILES_DIR)):
+        if file_name.endswith(".html"):
+            with open(os.path.join(PROFILES_DIR, file_name), "rb") as file:
+                pages[file_name[:-len(".html")]] = file.read()
+    return pages
+
+
+def record_fixture_pages(user_ids: list):
+    """
+    this function downloads live medium profile pages to use them as fixtures
+
+    Parameters
+    ----------
+    user_ids : list
+        the user ids of the pages to download.
+
+    Returns
+    -------
+    None.
+
+    """
+    use_scripts_directory()
+    import constants
+    import httpClient
+    for user_id in user_ids:
+        with open(os.path.join(PROFILES_DIR, user_id + ".html"), "wb") as file:
+            file.write(httpClient.fetch_page(constants.MEDIUM_URL + user_id).content)
+
+
+if __name__ == "__main__":
+    #record the live pages of the user ids given on the command line
+    record_fixture_pages(sys.argv[1:])
@@ -0,0 +1,248 @@
+"""
+this script checks the retries of the http client and the crawl workers against the local fixture server
+the fixture server answers some requests with 429 and 503 errors to check the number of attempts and the waits of fetch_page,
+removes a page from the conditional cache while it is revalidated to check it is downloaded again,
+serves one page slowly during a crawl to check the other workers keep scraping while the slow page is being downloaded,
+and is crawled further than the accounts it serves to check the crawls report that their frontier is exhausted
+the results are printed in a json format, a ValueError is raised when the client does not behave as expected
+"""
+import json
+import time
+import argparse
+import threading
+import profileFixtures
+import fixtureServer
+import benchmarkUtils
+
+
+def check_retries(server, user_id: str, failure_statuses: list, retry_after: int = None) -> dict:
+    """
+    this function queues error statuses for a page of the fixture server and checks fetch_page retries them before returning the page
+
+    Parameters
+    ----------
+    server : TYPE
+        the running fixture server.
+    user_id : str
+        the user id of the page to fetch, not fetched before.
+    failure_statuses : list
+        the error statuses sent before the page, no more than constants.CRAWLER_MAX_RETRIES.
+    retry_after : int, optional
+        the value of the Retry-After header of the errors. The default is None which sends no header.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the statuses sent, the number of requests received and the time waited compared with the expected waits.
+
+    """
+    import constants
+    import httpClient
+    server.failures[user_id] = list(failure_statuses)
+    server.retry_after = retry_after
+    start_time = time.perf_counter()
+    response = httpClient.fetch_page(constants.MEDIUM_URL + user_id)
+    duration = time.perf_counter() - start_time
+    number_of_requests = len([request for request in server.request_log if request[0] == user_id])
+    #the waits of fetch_page: the Retry-After header when it is sent and an exponential backoff otherwise
+    expected_wait = sum(retry_after if retry_after is not None else constants.CRAWLER_BACKOFF_SECONDS * (2 ** attempt) for attempt in range(len(failure_statuses)))
+    if response.status_code != 200 or response.content != server.pages[user_id]:
+        raise ValueError("the page of " + user_id + " was not returned after the retries")
+    if number_of_requests != len(failure_statuses) + 1:
+        raise ValueError("the page of " + user_id + " was requested " + str(number_of_requests) + " times instead of " + str(len(failure_statuses) + 1))
+    if duration < expected_wait:
+        raise ValueError("fetch_page waited " + str(duration) + " seconds before the last attempt instead of " + str(expected_wait))
+    return {"statuses": failure_statuses, "retry_after": retry_after, "requests": number_of_requests, "seconds": duration, "expected_wait_seconds": expected_wait}
+
+
+def check_retries_exhausted(server, user_id: str) -> dict:
+    """
+    this function checks fetch_page raises the error of the last attempt when a page keeps failing after all the retries
+
+    Parameters
+    ----------
+    server : TYPE
+        the running fixture server.
+    user_id : str
+        the user id of the page to fetch, not fetched before.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the number of requests received and the error raised.
+
+    """
+    import constants
+    import requests
+    import httpClient
+    server.failures[user_id] = [503] * (constants.CRAWLER_MAX_RETRIES + 1)
+    server.retry_after = None
+    try:
+        httpClient.fetch_page(constants.MEDIUM_URL + user_id)
+    except requests.HTTPError as exception:
+        error_message = str(exception)
+    else:
+        raise ValueError("fetch_page returned a page that failed on every attempt")
+    number_of_requests = len([request for request in server.request_log if request[0] == user_id])
+    if number_of_requests != constants.CRAWLER_MAX_RETRIES + 1:
+        raise ValueError("the failing page was requested " + str(number_of_requests) + " times instead of " + str(constants.CRAWLER_MAX_RETRIES + 1))
+    return {"requests": number_of_requests, "error": error_message}
+
+
+def check_evicted_revalidation(server, user_id: str, slow_seconds: float) -> dict:
+    """
+    this function removes a page from the conditional cache while it is being revalidated
+    and checks fetch_page downloads the page again instead of returning the empty 304 answer
+
+    Parameters
+    ----------
+    server : TYPE
+        the running fixture server.
+    user_id : str
+        the user id of the page to fetch, not fetched before.
+    slow_seconds : float
+        the extra time taken to answer the conditional request, the cache is cleared during it.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the number of requests received and the counters of the http client.
+
+    """
+    import constants
+    import httpClient
+    httpClient.fetch_page(constants.MEDIUM_URL + user_id)
+    server.slow_pages[user_id] = slow_seconds
+    revalidation = dict()
+    revalidation_thread = threading.Thread(target=lambda: revalidation.update(response=httpClient.fetch_page(constants.MEDIUM_URL + user_id)))
+    revalidation_thread.start()
+    #clear the cache once the conditional request has been received by the server
+    while len([request for request in server.request_log if request[0] == user_id]) < 2:
+        time.sleep(0.01)
+    httpClient.clear_conditional_cache()
+    del server.slow_pages[user_id]
+    revalidation_thread.join()
+    number_of_requests = len([request for request in server.request_log if request[0] == user_id])
+    if "response" not in revalidation or revalidation["response"].status_code != 200 or revalidation["response"].content != server.pages[user_id]:
+        raise ValueError("fetch_page did not return the page of " + user_id + " evicted from the cache during its revalidation")
+    if number_of_requests != 3:
+        raise ValueError("the page evicted during its revalidation was requested " + str(number_of_requests) + " times instead of 3")
+    return {"requests": number_of_requests, "http_stats": httpClient.get_http_stats()}
+
+
+def check_slow_page(server, number_of_accounts: int, number_of_workers: int, slow_seconds: float) -> dict:
+    """
+    this function crawls the fixture server while the second account of the crawl is served slowly
+    and counts the pages downloaded by the other workers during the slow download
+
+    Parameters
+    ----------
+    server : TYPE
+        the running fixture server.
+    number_of_accounts : int
+        the number of accounts collected by the crawl.
+    number_of_workers : int
+        the number of accounts scraped concurrently, more than 1.
+    slow_seconds : float
+        the extra time taken to serve the slow page.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the duration of the crawl and the number of pages downloaded while the slow page was being served.
+
+    """
+    import mediumScraper
+    benchmarkUtils.reset_scraper_caches()
+    first_account = server.accounts[0]
+    slow_user_id = first_account["following_top_5"][0]
+    server.slow_pages[slow_user_id] = slow_seconds
+    del server.request_log[:]
+    start_time = time.perf_counter()
+    collected_accounts = json.loads(mediumScraper.collect_medium_accounts(first_account["medium"], number_of_accounts, number_of_workers=number_of_workers))
+    duration = time.perf_counter() - start_time
+    del server.slow_pages[slow_user_id]
+    slow_request_time = [request[1] for request in server.request_log if request[0] == slow_user_id][0]
+    pages_during_slow_page = len([request for request in server.request_log if slow_request_time < request[1] < slow_request_time + slow_seconds])
+    #the pages started with the slow page are also served during it, the workers must keep starting new pages while it is served
+    if pages_during_slow_page < number_of_workers:
+        raise ValueError("the other workers stopped scraping while the slow page was being served")
+    return {"accounts": len(collected_accounts), "workers": number_of_workers, "seconds": duration, "slow_page_seconds": slow_seconds, "pages_during_slow_page": pages_during_slow_page}
+
+
+def check_crawl_status(server, number_of_workers: int) -> dict:
+    """
+    this function checks collect_medium_accounts reports the status of its crawls: a crawl collecting a few accounts completes,
+    a crawl asking for more accounts than the fixture server serves exhausts its frontier and a crawl starting from an unknown account fails
+
+    Parameters
+    ----------
+    server : TYPE
+        the running fixture server.
+    number_of_workers : int
+        the number of accounts scraped concurrently.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the status reported for every crawl.
+
+    """
+    import mediumScraper
+    first_user_id = server.accounts[0]["medium"]
+    crawl_statuses = dict()
+    for crawl_name, user_id, number_to_collect, expected_status in (("completed", first_user_id, 10, "completed"),
+                                                                  ("more_than_served", first_user_id, len(server.accounts) + 100, "frontier_exhausted"),
+                                                                  ("unknown_first_account", "not-a-served-account", 10, "first_account_failed")):
+        benchmarkUtils.reset_scraper_caches()
+        crawl_status = dict()
+        collected_accounts = json.loads(mediumScraper.collect_medium_accounts(user_id, number_to_collect, number_of_workers=number_of_workers, crawl_status=crawl_status))
+        if crawl_status.get("status") != expected_status or crawl_status.get("number_collected") != len(collected_accounts):
+            raise ValueError("the crawl " + crawl_name + " of " + str(number_to_collect) + " accounts collected " + str(len(collected_accounts)) + " accounts and reported " + str(crawl_status) + " instead of the status " + expected_status)
+        crawl_statuses[crawl_name] = crawl_status
+    return crawl_statuses
+
+
+def run_retry_benchmark(backoff_seconds: float = 0.05, slow_seconds: float = 1.0) -> dict:
+    """
+    this function runs the retry checks, the evicted revalidation check, the slow page check and the crawl status check against a new fixture server
+
+    Parameters
+    ----------
+    backoff_seconds : float, optional
+        the first backoff of the retries without Retry-After header, shorter than the default so the checks run quickly. The default is 0.05.
+    slow_seconds : float, optional
+        the extra time taken to serve the slow page of the crawl. The default is 1.0.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the results of every check.
+
+    """
+    profileFixtures.use_scripts_directory()
+    import constants
+    server = fixtureServer.start_fixture_server(0.01)
+    default_backoff_seconds = constants.CRAWLER_BACKOFF_SECONDS
+    try:
+        benchmarkUtils.use_fixture_server(server.base_url, 1000)
+        constants.CRAWLER_BACKOFF_SECONDS = backoff_seconds
+        user_ids = [account_data["medium"] for account_data in server.accounts[-5:]]
+        return {"retry_429_retry_after": check_retries(server, user_ids[0], [429], retry_after=1),
+                "retry_503_backoff": check_retries(server, user_ids[1], [503, 503]),
+                "retry_mixed_backoff": check_retries(server, user_ids[2], [429, 503, 502]),
+                "retries_exhausted": check_retries_exhausted(server, user_ids[3]),
+                "evicted_revalidation": check_evicted_revalidation(server, user_ids[4], 0.3),
+                "slow_page": check_slow_page(server, 50, 4, slow_seconds),
+                "crawl_status": check_crawl_status(server, 4)}
+    finally:
+        constants.CRAWLER_BACKOFF_SECONDS = default_backoff_seconds
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="check the retries of the http client and the crawl workers against error answers and a slow page")
+    argument_parser.add_argument("--backoff", type=float, default=0.05, help="first backoff in seconds of the retries without Retry-After header")
+    argument_parser.add_argument("--slow", type=float, default=1.0, help="extra seconds taken to serve the slow page of the crawl")
+    arguments = argument_parser.parse_args()
+    print(json.dumps(run_retry_benchmark(arguments.backoff, arguments.slow), indent=4))
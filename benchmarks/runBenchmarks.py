@@ -0,0 +1,53 @@
+"""
+this script runs all the offline benchmarks and saves their results in a single json file so runs can be compared between versions
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import parserBenchmark
+import scraperBenchmark
+import predictionBenchmark
+import apiBenchmark
+import startupBenchmark
+import retryBenchmark
+
+
+def run_benchmarks(quick: bool = False) -> dict:
+    """
+    this function runs the parser, scraper, prediction, api and startup benchmarks and the retry checks
+
+    Parameters
+    ----------
+    quick : bool, optional
+        True to run fewer rounds and requests, to check the benchmarks run rather than to measure. The default is False.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the environment of the run and the results of every benchmark.
+
+    """
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python_version": sys.version.split()[0],
+            "platform": platform.platform(),
+            "parser": parserBenchmark.run_parser_benchmark(5 if quick else 50),
+            "scraper": scraperBenchmark.run_scraper_benchmark(1 if quick else 3, 30 if quick else 100),
+            "prediction": predictionBenchmark.run_prediction_benchmark(2 if quick else 20),
+            "api": apiBenchmark.run_api_benchmark(20 if quick else 200),
+            "startup": startupBenchmark.run_startup_benchmark(1 if quick else 5, 20 if quick else 200),
+            "retries": retryBenchmark.run_retry_benchmark()}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="run all the offline benchmarks")
+    argument_parser.add_argument("--output", help="json file where the results are saved, they are printed when it is not given")
+    argument_parser.add_argument("--quick", action="store_true", help="run fewer rounds and requests")
+    arguments = argument_parser.parse_args()
+    results = json.dumps(run_benchmarks(arguments.quick), indent=4)
+    if arguments.output is None:
+        print(results)
+    else:
+        with open(arguments.output, "w") as file:
+            file.write(results)
@@ -0,0 +1,131 @@
+"""
+this script measures the scraping and crawling throughput against the local fixture server
+get_medium_page_data is measured on downloaded pages, on pages revalidated with a 304 answer and on pages served by the profile cache,
+collect_medium_accounts is measured with several numbers of workers, the fixture server waiting before every answer like a remote server would
+the results are printed in a json format
+"""
+import json
+import time
+import argparse
+import profileFixtures
+import fixtureServer
+import benchmarkUtils
+
+
+def benchmark_page_scraping(server, number_of_rounds: int) -> dict:
+    """
+    this function scrapes all the pages of the fixture server number_of_rounds times in every mode of get_medium_page_data
+
+    Parameters
+    ----------
+    server : ThreadingHTTPServer
+        the running fixture server.
+    number_of_rounds : int
+        the number of times every page is scraped in every mode.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the pages scraped per second and the latencies of the "downloaded", "not_modified" and "cached" modes.
+
+    """
+    import httpClient
+    import mediumScraper
+    user_ids = [account_data["medium"] for account_data in server.accounts]
+    latencies = {"downloaded": [], "not_modified": [], "cached": []}
+    durations = {"downloaded": 0.0, "not_modified": 0.0, "cached": 0.0}
+    for _ in range(number_of_rounds):
+        benchmarkUtils.reset_scraper_caches()
+        for mode in ("downloaded", "not_modified", "cached"):
+            for user_id in user_ids:
+                start_time = time.perf_counter()
+                #the profile cache is only used in the cached mode, the page kept by the http client makes the second pass a 304
+                user_data_json = mediumScraper.get_medium_page_data(user_id, use_cache=(mode == "cached"))
+                latency = time.perf_counter() - start_time
+                if user_data_json is None:
+                    raise ValueError("the fixture page of " + user_id + " could not be scraped")
+                latencies[mode].append(latency)
+                durations[mode] += latency
+    results = dict()
+    for mode in latencies:
+        results[mode] = {"pages_per_second": len(latencies[mode]) / durations[mode], "latency": benchmarkUtils.summarize_latencies(latencies[mode])}
+    results["http_stats"] = httpClient.get_http_stats()
+    return results
+
+
+def benchmark_crawl(server, number_to_collect: int, number_of_workers: int) -> dict:
+    """
+    this function crawls the fixture server from its first account with collect_medium_accounts and an empty profile cache
+
+    Parameters
+    ----------
+    server : ThreadingHTTPServer
+        the running fixture server.
+    number_to_collect : int
+        the number of accounts to collect.
+    number_of_workers : int
+        the number of accounts scraped concurrently.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the number of workers, the number of accounts collected, the duration and the accounts collected per second.
+
+    """
+    import mediumScraper
+    benchmarkUtils.reset_scraper_caches()
+    start_time = time.perf_counter()
+    account_data_list = json.loads(mediumScraper.collect_medium_accounts(server.accounts[0]["medium"], number_to_collect, number_of_workers=number_of_workers))
+    duration = time.perf_counter() - start_time
+    return {"workers": number_of_workers, "accounts": len(account_data_list), "seconds": duration, "accounts_per_second": len(account_data_list) / duration}
+
+
+def run_scraper_benchmark(number_of_rounds: int = 3, number_to_collect: int = 100, worker_counts: list = [1, 4, 16], latency_seconds: float = 0.02, requests_per_second: float = 1000.0) -> dict:
+    """
+    this function starts the fixture server and runs the scraping and crawling benchmarks
+
+    Parameters
+    ----------
+    number_of_rounds : int, optional
+        the number of times every page is scraped in every mode. The default is 3.
+    number_to_collect : int, optional
+        the number of accounts collected by every crawl. The default is 100.
+    worker_counts : list, optional
+        the numbers of workers the crawl is measured with. The default is [1, 4, 16].
+    latency_seconds : float, optional
+        the delay of the fixture server before every answer of the crawls. The default is 0.02.
+    requests_per_second : float, optional
+        the rate limit of the crawler, high enough by default to measure the scraper rather than the rate limit. The default is 1000.0.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the parameters and the results of the benchmarks.
+
+    """
+    profileFixtures.use_scripts_directory()
+    #the pages are scraped without network latency to measure the cost of the scraper itself
+    server = fixtureServer.start_fixture_server()
+    try:
+        benchmarkUtils.use_fixture_server(server.base_url, requests_per_second)
+        page_scraping = benchmark_page_scraping(server, number_of_rounds)
+        server.latency_seconds = latency_seconds
+        crawls = [benchmark_crawl(server, number_to_collect, number_of_workers) for number_of_workers in worker_counts]
+    finally:
+        server.shutdown()
+    return {"served_accounts": len(server.accounts),
+            "server_latency_seconds": latency_seconds,
+            "requests_per_second": requests_per_second,
+            "page_scraping": page_scraping,
+            "crawls": crawls}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="measure the scraping and crawling throughput against the local fixture server")
+    argument_parser.add_argument("--rounds", type=int, default=3, help="number of times every fixture page is scraped in every mode")
+    argument_parser.add_argument("--accounts", type=int, default=100, help="number of accounts collected by every crawl")
+    argument_parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16], help="numbers of workers the crawl is measured with")
+    argument_parser.add_argument("--latency", type=float, default=0.02, help="delay in seconds of the fixture server before every answer of the crawls")
+    argument_parser.add_argument("--requests-per-second", type=float, default=1000.0, help="rate limit of the crawler")
+    arguments = argument_parser.parse_args()
+    print(json.dumps(run_scraper_benchmark(arguments.rounds, arguments.accounts, arguments.workers, arguments.latency, arguments.requests_per_second), indent=4))
@@ -0,0 +1,157 @@
+"""
+this script measures the cold start of an api worker and the size and serialization time of the api responses
+the import of predictionApi is measured in new processes with the serving imports only, and with pandas, the sklearn metrics and beautifulsoup
+imported first like when mediumScraper imported them at the top of the module.
+only the import step is lighter with the serving imports, unpickling the model imports pandas and sklearn so a ready worker uses the same memory and time in both modes.
+the responses are rendered in the indented format of PrettyJSONResponse and in the compact format used by default
+the results are printed in a json format
+"""
+import os
+import json
+import time
+import argparse
+import subprocess
+import sys
+import profileFixtures
+
+#modules that were imported by predictionApi before the imports needed only outside of the serving path were moved into the functions using them
+EAGER_IMPORTS = "import pandas, sklearn.metrics, bs4"
+
+#code run in the measured process, it prints the import time, the time until the worker is ready to serve, the current and peak memory
+#and the heavy modules loaded after the import and after the model is loaded, unpickling the model imports the parts of sklearn it needs
+STARTUP_CODE = """
+import json, sys, time
+heavy_modules = ("pandas", "sklearn", "sklearn.metrics", "bs4", "pymongo")
+
+def read_memory_mb():
+    #the memory is read from /proc/self/status, ru_maxrss would include the peak memory of the parent process inherited through fork
+    with open("/proc/self/status", "r") as status_file:
+        memory = {{line.split(":")[0]: int(line.split()[1]) / 1024 for line in status_file if line.startswith(("VmRSS:", "VmHWM:"))}}
+    return memory["VmRSS"], memory["VmHWM"]
+
+start_time = time.perf_counter()
+{preimports}
+import predictionApi
+import_seconds = time.perf_counter() - start_time
+import_rss_mb, import_peak_rss_mb = read_memory_mb()
+modules_after_import = [module for module in heavy_modules if module in sys.modules]
+predictionApi.load_prediction_model()
+ready_seconds = time.perf_counter() - start_time
+ready_rss_mb, ready_peak_rss_mb = read_memory_mb()
+print(json.dumps({{"import_seconds": import_seconds,
+                  "import_rss_mb": import_rss_mb,
+                  "import_peak_rss_mb": import_peak_rss_mb,
+                  "modules_after_import": modules_after_import,
+                  "ready_seconds": ready_seconds,
+                  "ready_rss_mb": ready_rss_mb,
+                  "ready_peak_rss_mb": ready_peak_rss_mb,
+                  "modules_after_model_load": [module for module in heavy_modules if module in sys.modules]}}))
+"""
+
+
+def measure_startup(preimports: str, number_of_runs: int) -> dict:
+    """
+    this function starts new python processes importing predictionApi and loading the model, and keeps the median of their measures
+
+    Parameters
+    ----------
+    preimports : str
+        the import statements run before importing predictionApi.
+    number_of_runs : int
+        the number of processes started.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the median time, memory and peak memory after the import and once the worker is ready, and the heavy modules loaded at both steps.
+
+    """
+    runs = []
+    for _ in range(number_of_runs):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", STARTUP_CODE.format(preimports=preimports)],
+                                cwd=profileFixtures.SCRIPTS_DIR, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    startup = {measure: sorted(run[measure] for run in runs)[len(runs) // 2] for measure in ("import_seconds", "import_rss_mb", "import_peak_rss_mb", "ready_seconds", "ready_rss_mb", "ready_peak_rss_mb")}
+    startup.update({"modules_after_import": runs[0]["modules_after_import"], "modules_after_model_load": runs[0]["modules_after_model_load"]})
+    return startup
+
+
+def load_response_payloads() -> dict:
+    """
+    this function builds typical payloads of the api responses from the datasets
+
+    Returns
+    -------
+    dict
+        dictionnary of the payloads keyed by the route returning them.
+
+    """
+    with open(os.path.join(profileFixtures.BENCHMARKS_DIR, "..", "data", "accounts_data.json"), "r", encoding="utf-8") as file:
+        accounts = json.loads(file.read())
+    return {"/predictMediumUser/{user_id}": accounts[0],
+            "/predictUsersStartingWith/{user_id}/100": accounts[:100],
+            "/predictBatch": {"descriptions": [{"description": account_data["description"], "type": account_data["type"], "probability": 0.9} for account_data in accounts[:100]], "user_ids": []},
+            "/checkTrainingData": [{"medium": account_data["medium"], "is_in_training_dataset": False} for account_data in accounts[:100]]}
+
+
+def benchmark_response(content, response_class, number_of_renders: int) -> dict:
+    """
+    this function renders a payload with a response class and measures the size and the render time of the response
+
+    Parameters
+    ----------
+    content : TYPE
+        the payload of the response.
+    response_class : TYPE
+        the response class of the api.
+    number_of_renders : int
+        the number of times the response is rendered.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the size of the body in bytes and the mean render time in microseconds.
+
+    """
+    start_time = time.perf_counter()
+    for _ in range(number_of_renders):
+        body = response_class(content).body
+    return {"bytes": len(body), "render_us": 1000000 * (time.perf_counter() - start_time) / number_of_renders}
+
+
+def run_startup_benchmark(number_of_runs: int = 5, number_of_renders: int = 200) -> dict:
+    """
+    this function runs the cold start and the response benchmarks
+
+    Parameters
+    ----------
+    number_of_runs : int, optional
+        the number of processes started for every import mode. The default is 5.
+    number_of_renders : int, optional
+        the number of times every response is rendered in every format. The default is 200.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the startup measures of both import modes and the size and render time of every response in every format.
+
+    """
+    profileFixtures.use_scripts_directory()
+    import predictionApi
+    responses = dict()
+    for route, content in load_response_payloads().items():
+        pretty = benchmark_response(content, predictionApi.PrettyJSONResponse, number_of_renders)
+        compact = benchmark_response(content, predictionApi.CompactJSONResponse, number_of_renders)
+        responses[route] = {"pretty": pretty, "compact": compact, "size_ratio": compact["bytes"] / pretty["bytes"]}
+    return {"json_encoder": "orjson" if predictionApi.orjson is not None else "json",
+            "startup": {"serving_imports": measure_startup("", number_of_runs),
+                        "eager_imports": measure_startup(EAGER_IMPORTS, number_of_runs)},
+            "responses": responses}
+
+
+if __name__ == "__main__":
+    argument_parser = argparse.ArgumentParser(description="measure the cold start of an api worker and the size of the api responses")
+    argument_parser.add_argument("--runs", type=int, default=5, help="number of processes started for every import mode")
+    argument_parser.add_argument("--renders", type=int, default=200, help="number of times every response is rendered in every format")
+    arguments = argument_parser.parse_args()
+    print(json.dumps(run_startup_benchmark(arguments.runs, arguments.renders), indent=4))
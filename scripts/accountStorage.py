@@ -0,0 +1,192 @@
+"""
+this script contains the storage backends of the collected accounts
+the accounts are buffered and written in batches so a crawl can flush them incrementally instead of storing everything at the end
+writing the same account twice is idempotent: mongodb upserts it on its medium id and the jsonl file is read back with the last line of each account winning
+"""
+import os
+import json
+import constants
+
+
+class JsonlAccountStorage:
+    """
+    append-only storage writing one json account per line to a file
+    """
+
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path if file_path is not None else constants.USER_DATA_JSONL
+        self.buffer = []
+
+    def write_account(self, account_data: dict):
+        """
+        this function adds an account to the buffer and writes the buffer when it is full
+
+        Parameters
+        ----------
+        account_data : dict
+            the data of the account to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(account_data)
+        if len(self.buffer) >= constants.STORAGE_FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        this function appends the buffered accounts to the file and syncs it to the disk
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.buffer:
+            return
+        with open(self.file_path, 'a', encoding='utf-8') as file:
+            file.write("".join(json.dumps(account_data, ensure_ascii=False) + "\n" for account_data in self.buffer))
+            file.flush()
+            os.fsync(file.fileno())
+        self.buffer = []
+
+    def close(self):
+        """
+        this function writes the accounts left in the buffer
+
+        Returns
+        -------
+        None.
+
+        """
+        self.flush()
+
+    def iter_accounts(self):
+        """
+        this generator streams the stored accounts back one line at a time without loading the whole file.
+        an account written several times is yielded once per write, the last one being the most recent
+
+        Yields
+        ------
+        dict
+            the data of a stored account.
+
+        """
+        if not os.path.exists(self.file_path):
+            return
+        with open(self.file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                #skip the empty lines and a last line left incomplete by an interrupted write
+                if line.strip() and line.endswith("\n"):
+                    yield json.loads(line)
+
+    def iter_latest_accounts(self):
+        """
+        this generator streams the last stored version of every account, in the order of their last write.
+        the file is read twice: once to find the last line of every medium id, keeping only the ids and line numbers in memory, and once to yield those lines
+
+        Yields
+        ------
+        dict
+            the data of a stored account in its last version.
+
+        """
+        last_positions = {account_data["medium"]: position for position, account_data in enumerate(self.iter_accounts())}
+        for position, account_data in enumerate(self.iter_accounts()):
+            if last_positions.get(account_data["medium"]) == position:
+                yield account_data
+
+
+class MongoAccountStorage:
+    """
+    storage upserting the accounts in a mongodb collection with batched bulk writes and a unique index on the medium id
+    """
+
+    def __init__(self, mongo_client=None):
+        if mongo_client is None:
+            from pymongo import MongoClient
+            mongo_client = MongoClient(constants.MONGO_URI)
+        self.collection = mongo_client[constants.DATABASE_NAME][constants.COLLECTION_NAME]
+        self.collection.create_index("medium", unique=True)
+        self.buffer = []
+
+    def write_account(self, account_data: dict):
+        """
+        this function adds an account to the buffer and writes the buffer when it is full
+
+        Parameters
+        ----------
+        account_data : dict
+            the data of the account to store.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.buffer.append(account_data)
+        if len(self.buffer) >= constants.STORAGE_FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+        this function upserts the buffered accounts in a single unordered bulk write
+
+        Returns
+        -------
+        None.
+
+        """
+        if not self.buffer:
+            return
+        from pymongo import ReplaceOne
+        self.collection.bulk_write([ReplaceOne({"medium": account_data["medium"]}, account_data, upsert=True) for account_data in self.buffer], ordered=False)
+        self.buffer = []
+
+    def close(self):
+        """
+        this function writes the accounts left in the buffer
+
+        Returns
+        -------
+        None.
+
+        """
+        self.flush()
+
+    def iter_accounts(self):
+        """
+        this generator streams the stored accounts from the collection
+
+        Yields
+        ------
+        dict
+            the data of a stored account.
+
+        """
+        for account_data in self.collection.find({}, {"_id": 0}):
+            yield account_data
+
+
+def get_account_storage(use_mongodb: bool = False, mongo_client=None):
+    """
+    this function returns the storage backend used to store the accounts
+
+    Parameters
+    ----------
+    use_mongodb : bool, optional
+        True to store the accounts in mongodb and False to store them in the jsonl file of constants.USER_DATA_JSONL. The default is False.
+    mongo_client : TYPE, optional
+        the mongo client to use instead of connecting to constants.MONGO_URI, like a mongomock client. The default is None.
+
+    Returns
+    -------
+    JsonlAccountStorage or MongoAccountStorage
+        the storage backend.
+
+    """
+    if(use_mongodb):
+        return MongoAccountStorage(mongo_client)
+    return JsonlAccountStorage()
@@ -11,9 +11,18 @@ MODEL_NAME = "../models/logisticRegressionPredictionModel.pkl"
 #directory of the text data vectorizer
 VECTORIZER_NAME = "../models/countVectorizer.pkl"
 
-#directory of the new stored accounts
+#manifest of the model published by the training pipeline, when it exists the model registry loads the model and vectorizer files it points to instead of the two files above
+MODEL_MANIFEST = "../models/current_model.json"
+
+#directory where the training pipeline publishes every trained model version in its own folder
+MODELS_DIR = "../models"
+
+#directory of the accounts stored before the jsonl storage was introduced, one json array per file
 USER_DATA_JSON = "../data/accounts_data.json"
 
+#directory of the new stored accounts, one json account per line appended to the file
+USER_DATA_JSONL = "../data/accounts_data.jsonl"
+
 #directory of the labeled training dataset
 TRAINING_DATA_JSON = "../data/accounts_training_data.json"
 
@@ -23,6 +32,13 @@ TESTING_DATA_JSON = "../data/accounts_testing_data.json"
 #directory of the log file
 LOGFILE_DIR = "../logs/LogFile.log"
 
+#fraction of the calls of the decorated functions written to the log file, 1 to log every call and 0 to disable the logging of the calls
+#the errors are always logged
+LOG_CALL_SAMPLE_RATE = 0.01
+
+#upper bounds in seconds of the buckets of the latency histograms of the decorated functions
+LATENCY_HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
 #Mongo connection uri
 MONGO_URI = "mongodb://localhost:27017/"
 
@@ -30,4 +46,122 @@ MONGO_URI = "mongodb://localhost:27017/"
 DATABASE_NAME = "medium_database"
 
 #Mongo accounts collection name
-COLLECTION_NAME = "medium_accounts_collection"
\ No newline at end of file
+COLLECTION_NAME = "medium_accounts_collection"
+
+#number of threads used to scrape accounts concurrently by default
+CRAWLER_WORKERS = 1
+
+#maximum number of requests per second sent to the same host
+CRAWLER_REQUESTS_PER_SECOND = 5.0
+
+#number of requests that can be sent at once to the same host before the rate limit applies
+CRAWLER_BURST_SIZE = 5
+
+#maximum number of retries of a request that failed with a 429, a 5xx or a connection error
+CRAWLER_MAX_RETRIES = 3
+
+#delay in seconds before the first retry, doubled on each new retry
+CRAWLER_BACKOFF_SECONDS = 0.5
+
+#timeout in seconds to open a connection to medium
+HTTP_CONNECT_TIMEOUT = 5
+
+#timeout in seconds to wait for medium to send data once connected
+HTTP_READ_TIMEOUT = 20
+
+#maximum number of keep-alive connections kept open per host by the shared http session
+HTTP_POOL_SIZE = 16
+
+#maximum number of pages whose ETag and Last-Modified headers are kept to send conditional requests on recrawls
+HTTP_CONDITIONAL_CACHE_SIZE = 1000
+
+#maximum size in bytes of the compressed pages kept to be served again when a conditional request is answered with 304
+HTTP_CONDITIONAL_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+#maximum number of scraped profiles kept in the in-memory cache
+PROFILE_CACHE_SIZE = 10000
+
+#number of seconds a scraped profile is served from the cache before being scraped again
+PROFILE_CACHE_TTL_SECONDS = 3600
+
+#directory of the sqlite file used as the on-disk profile cache tier, None to only cache in memory
+PROFILE_CACHE_DB = None
+
+#maximum number of profiles kept in the on-disk cache tier
+PROFILE_CACHE_DB_MAX_ENTRIES = 100000
+
+#number of profiles evicted at once from the on-disk cache tier when it grows over its maximum size
+PROFILE_CACHE_DB_EVICTION_BATCH = 1000
+
+#number of cache hits whose access time is kept in memory before being written to the on-disk cache tier in one transaction
+PROFILE_CACHE_DB_ACCESS_FLUSH_SIZE = 100
+
+#number of threads of the api used to scrape single accounts
+API_SCRAPING_WORKERS = 16
+
+#number of threads of the api used to run the prediction model
+API_PREDICTION_WORKERS = 2
+
+#number of crawls of multiple accounts the api runs at the same time
+API_CRAWL_WORKERS = 2
+
+#number of threads of the api used to scrape the user ids of the batch predictions, separate from the threads scraping single accounts
+API_BATCH_SCRAPING_WORKERS = 4
+
+#timeout in seconds of the api requests scraping and predicting single accounts
+API_REQUEST_TIMEOUT = 30
+
+#timeout in seconds of the api requests crawling multiple accounts
+API_CRAWL_TIMEOUT = 600
+
+#number of accounts buffered by the storage backends before they are written during a crawl
+STORAGE_FLUSH_SIZE = 100
+
+#parser used to extract the user data from the medium pages, "lxml" for the fast C parser or "bs4" for the beautifulsoup parser
+#the beautifulsoup parser is used when lxml is not installed
+PARSER_BACKEND = "lxml"
+
+#version of the selectors below, to increase every time they are updated after a change of the medium page layout
+PAGE_SELECTORS_VERSION = 1
+
+#tag and class of the elements containing the user data in the medium profile pages
+PAGE_SELECTORS = {
+    #right hand section of the page containing the user data
+    "sidebar": ("div", "ag dq ck cj"),
+    #links to the accounts followed by the user
+    "following_link": ("a", "au av aw ax ay az ba bb bc bd be bf bg bh bi"),
+    #number of followers of the user
+    "follower_count": ("span", "pw-follower-count"),
+    #name of the user
+    "author_name": ("h2", "pw-author-name"),
+}
+
+#directory of the checkpoints of the crawl jobs
+CRAWL_JOBS_DIR = "../data/crawl_jobs"
+
+#number of collected accounts between two checkpoints of a crawl job
+CRAWL_CHECKPOINT_INTERVAL = 100
+
+#file of the follow graph recorded by the crawls, the medium ids and the following edges of the scraped accounts
+FOLLOW_GRAPH_FILE = "../data/follow_graph.npz"
+
+#number of hours a stored account is considered fresh and is not scraped again by the incremental recrawl
+RECRAWL_FRESHNESS_HOURS = 24
+
+#maximum number of predictions memoized by normalized description and model version
+PREDICTION_CACHE_SIZE = 50000
+
+#number of labeled accounts read and fitted at a time by the training pipeline
+TRAINING_CHUNK_SIZE = 1000
+
+#number of passes of the training pipeline over the labeled accounts
+TRAINING_EPOCHS = 10
+
+#number of features of the hashing vectorizer of the training pipeline
+TRAINING_HASH_FEATURES = 2 ** 20
+
+#regularization strength of the SGD classifier of the training pipeline
+TRAINING_ALPHA = 0.0001
+
+#minimum weighted f1-score on the testing dataset for a trained model to be published
+TRAINING_MIN_F1_SCORE = 0.85
@@ -0,0 +1,162 @@
+"""
+this script contains the frontier of the crawl which holds the medium ids waiting to be scraped
+every id is enqueued at most once so adding and taking ids costs O(1) and crawls stay linear in the number of accounts
+"""
+import heapq
+
+from collections import deque
+
+
+class CrawlFrontier:
+    """
+    queue of the medium ids to scrape, in breadth first order or ordered by the number of followers of the account that led to them
+    """
+
+    def __init__(self, excluded_ids=frozenset(), prioritize_by_followers: bool = False):
+        #ids that must never be scraped, like the accounts of the training dataset
+        self.excluded_ids = excluded_ids
+        #ids that have already been added to the frontier once, scraped or not
+        self.enqueued_ids = set()
+        self.prioritize_by_followers = prioritize_by_followers
+        #double ended queue used in breadth first mode and heap used in priority mode
+        self.queue = deque()
+        self.heap = []
+        #counter used to keep the insertion order between ids with the same priority
+        self.insertion_counter = 0
+        #ids taken from the frontier whose scraping is not over, with their heap entry in priority mode, saved back in the frontier by to_dict
+        self.in_flight = dict()
+
+    def add(self, user_ids: list, num_followers: int = 0):
+        """
+        this function adds the ids that were never enqueued and are not excluded to the frontier
+
+        Parameters
+        ----------
+        user_ids : list
+            the medium ids to add, usually the top 5 following accounts of a scraped account.
+        num_followers : int, optional
+            the number of followers of the account that led to these ids, used as their priority in priority mode. The default is 0.
+
+        Returns
+        -------
+        None.
+
+        """
+        for user_id in user_ids:
+            if not user_id or user_id in self.enqueued_ids or user_id in self.excluded_ids:
+                continue
+            self.enqueued_ids.add(user_id)
+            if self.prioritize_by_followers:
+                heapq.heappush(self.heap, (-num_followers, self.insertion_counter, user_id))
+                self.insertion_counter += 1
+            else:
+                self.queue.append(user_id)
+
+    def mark_seen(self, user_id: str):
+        """
+        this function records an id that was scraped without going through the frontier so it is never enqueued later
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id to record.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.enqueued_ids.add(user_id)
+
+    def pop(self) -> str:
+        """
+        this function removes and returns the next medium id to scrape, the id stays in flight until mark_done is called
+
+        Returns
+        -------
+        str
+            the next medium id. an IndexError is raised if the frontier is exhausted.
+
+        """
+        if self.prioritize_by_followers:
+            heap_entry = heapq.heappop(self.heap)
+            self.in_flight[heap_entry[2]] = heap_entry
+            return heap_entry[2]
+        user_id = self.queue.popleft()
+        self.in_flight[user_id] = None
+        return user_id
+
+    def mark_done(self, user_id: str):
+        """
+        this function records that the scraping of an id taken from the frontier is over, whether it succeeded or not
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id taken with pop.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.in_flight.pop(user_id, None)
+
+    def is_exhausted(self) -> bool:
+        """
+        this function returns whether there are no ids left to scrape
+
+        Returns
+        -------
+        bool
+            True if the frontier is empty.
+
+        """
+        return len(self) == 0
+
+    def to_dict(self) -> dict:
+        """
+        this function returns the state of the frontier in a format that can be saved in json to resume the crawl later.
+        the ids in flight are saved as waiting to be scraped, at the head of the queue or with their priority in the heap
+
+        Returns
+        -------
+        dict
+            dictionnary containing the ids waiting to be scraped and the ids already enqueued.
+
+        """
+        return {"prioritize_by_followers": self.prioritize_by_followers,
+                "queue": [user_id for user_id, heap_entry in self.in_flight.items() if heap_entry is None] + list(self.queue),
+                "heap": self.heap + [heap_entry for heap_entry in self.in_flight.values() if heap_entry is not None],
+                "insertion_counter": self.insertion_counter,
+                "enqueued_ids": list(self.enqueued_ids)}
+
+    @classmethod
+    def from_dict(cls, frontier_state: dict, excluded_ids=frozenset()):
+        """
+        this function rebuilds a frontier from the state returned by to_dict
+
+        Parameters
+        ----------
+        frontier_state : dict
+            the saved state of the frontier.
+        excluded_ids : TYPE, optional
+            ids that must never be scraped. The default is frozenset().
+
+        Returns
+        -------
+        CrawlFrontier
+            the frontier in the state it was saved in.
+
+        """
+        frontier = cls(excluded_ids, frontier_state["prioritize_by_followers"])
+        frontier.queue = deque(frontier_state["queue"])
+        #json turns the heap tuples into lists, the ids that were in flight are appended to the saved heap so it is ordered again
+        frontier.heap = [tuple(heap_entry) for heap_entry in frontier_state["heap"]]
+        heapq.heapify(frontier.heap)
+        frontier.insertion_counter = frontier_state["insertion_counter"]
+        frontier.enqueued_ids = set(frontier_state["enqueued_ids"])
+        return frontier
+
+    def __len__(self) -> int:
+        return len(self.heap) if self.prioritize_by_followers else len(self.queue)
@@ -0,0 +1,217 @@
+"""
+this script contains the crawl jobs which save checkpoints of a crawl so it can be resumed after a crash or a redeploy
+a job is saved in two files of constants.CRAWL_JOBS_DIR:
+the checkpoint <job_id>.json holding the parameters, the status and the frontier of the crawl,
+and <job_id>.accounts.jsonl where the collected accounts are appended, one account per line
+"""
+import os
+import json
+import uuid
+import constants
+
+from crawlFrontier import CrawlFrontier
+
+
+class CrawlJob:
+    """
+    crawl identified by a job id whose frontier and collected accounts are saved every constants.CRAWL_CHECKPOINT_INTERVAL accounts
+    """
+
+    def __init__(self, job_id: str, parameters: dict):
+        self.job_id = job_id
+        self.parameters = parameters
+        self.status = "running"
+        self.frontier = None
+        #number of accounts saved in the accounts file at the last checkpoint
+        self.number_of_accounts = 0
+        self.accounts_since_checkpoint = 0
+        #whether the accounts written after the last checkpoint by a previous run have been removed from the accounts file
+        self.accounts_file_truncated = False
+
+    @classmethod
+    def create(cls, parameters: dict, job_id: str = None):
+        """
+        this function creates a new crawl job
+
+        Parameters
+        ----------
+        parameters : dict
+            the parameters of the crawl, used to restart it with the same parameters.
+        job_id : str, optional
+            the id of the job. The default is None which generates a random id.
+
+        Returns
+        -------
+        CrawlJob
+            the new crawl job.
+
+        """
+        if job_id is None:
+            job_id = uuid.uuid4().hex
+        crawl_job = cls(job_id, parameters)
+        if os.path.exists(crawl_job.get_checkpoint_path()):
+            raise ValueError("the crawl job " + job_id + " already exists, resume it instead of starting it again")
+        os.makedirs(constants.CRAWL_JOBS_DIR, exist_ok=True)
+        #empty the accounts file in case it was left by a job whose first checkpoint was never written
+        open(crawl_job.get_accounts_path(), 'w').close()
+        crawl_job.accounts_file_truncated = True
+        #save a first checkpoint without frontier so a job stopped before its first account restarts from the first user
+        crawl_job.checkpoint()
+        return crawl_job
+
+    @classmethod
+    def load(cls, job_id: str, excluded_ids=frozenset()):
+        """
+        this function loads a crawl job from its last checkpoint
+
+        Parameters
+        ----------
+        job_id : str
+            the id of the job.
+        excluded_ids : TYPE, optional
+            ids the frontier must never scrape, like the accounts of the training dataset. The default is frozenset().
+
+        Returns
+        -------
+        CrawlJob
+            the crawl job in the state of its last checkpoint.
+
+        """
+        crawl_job = cls(job_id, None)
+        with open(crawl_job.get_checkpoint_path(), 'r') as file:
+            checkpoint = json.loads(file.read())
+        crawl_job.parameters = checkpoint["parameters"]
+        crawl_job.status = checkpoint["status"]
+        crawl_job.number_of_accounts = checkpoint["number_of_accounts"]
+        if checkpoint["frontier"] is not None:
+            crawl_job.frontier = CrawlFrontier.from_dict(checkpoint["frontier"], excluded_ids)
+        return crawl_job
+
+    def get_checkpoint_path(self) -> str:
+        return os.path.join(constants.CRAWL_JOBS_DIR, self.job_id + ".json")
+
+    def get_accounts_path(self) -> str:
+        return os.path.join(constants.CRAWL_JOBS_DIR, self.job_id + ".accounts.jsonl")
+
+    def load_accounts(self) -> list:
+        """
+        this function reads the accounts collected up to the last checkpoint, ignoring the accounts written after it
+
+        Returns
+        -------
+        list
+            the collected accounts.
+
+        """
+        account_data_list = []
+        with open(self.get_accounts_path(), 'r', encoding='utf-8') as file:
+            for line in file:
+                if len(account_data_list) == self.number_of_accounts:
+                    break
+                account_data_list.append(json.loads(line))
+        return account_data_list
+
+    def record_accounts(self, account_data_list: list):
+        """
+        this function appends collected accounts to the accounts file and saves a checkpoint when enough accounts were collected since the last one.
+        the frontier of the job must already contain the following accounts of these accounts
+
+        Parameters
+        ----------
+        account_data_list : list
+            the accounts collected since the last call.
+
+        Returns
+        -------
+        None.
+
+        """
+        if not account_data_list:
+            return
+        if not self.accounts_file_truncated:
+            #drop the accounts written after the last checkpoint by a crawl that stopped before its next checkpoint
+            self.truncate_accounts_file()
+            self.accounts_file_truncated = True
+        self.accounts_since_checkpoint += len(account_data_list)
+        with open(self.get_accounts_path(), 'a', encoding='utf-8') as file:
+            file.write("".join(json.dumps(account_data, ensure_ascii=False) + "\n" for account_data in account_data_list))
+        if self.accounts_since_checkpoint >= constants.CRAWL_CHECKPOINT_INTERVAL:
+            self.checkpoint()
+
+    def truncate_accounts_file(self):
+        """
+        this function removes the lines of the accounts file written after the last checkpoint
+
+        Returns
+        -------
+        None.
+
+        """
+        with open(self.get_accounts_path(), 'r+', encoding='utf-8') as file:
+            for _ in range(self.number_of_accounts):
+                file.readline()
+            file.truncate(file.tell())
+
+    def checkpoint(self):
+        """
+        this function saves the state of the job. the checkpoint is written to a temporary file first
+        and then renamed so a crash during the write never leaves a corrupted checkpoint
+
+        Returns
+        -------
+        None.
+
+        """
+        #the accounts must be on the disk before the checkpoint counting them is saved
+        with open(self.get_accounts_path(), 'a') as file:
+            os.fsync(file.fileno())
+        self.number_of_accounts += self.accounts_since_checkpoint
+        self.accounts_since_checkpoint = 0
+        checkpoint = {"job_id": self.job_id,
+                      "parameters": self.parameters,
+                      "status": self.status,
+                      "number_of_accounts": self.number_of_accounts,
+                      "frontier": self.frontier.to_dict() if self.frontier is not None else None}
+        temporary_path = self.get_checkpoint_path() + ".tmp"
+        with open(temporary_path, 'w') as file:
+            file.write(json.dumps(checkpoint))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, self.get_checkpoint_path())
+
+    def finish(self, status: str):
+        """
+        this function saves the final checkpoint of the job with its final status
+
+        Parameters
+        ----------
+        status : str
+            "completed" when the required number of accounts was collected, "frontier_exhausted" when no accounts were left to scrape
+            or "first_account_failed" when the first account could not be scraped.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.status = status
+        self.checkpoint()
+
+
+def get_crawl_job_status(job_id: str) -> dict:
+    """
+    this function returns the status of a crawl job at its last checkpoint
+
+    Parameters
+    ----------
+    job_id : str
+        the id of the job.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the job id, its parameters, its status and the number of accounts collected.
+
+    """
+    crawl_job = CrawlJob.load(job_id)
+    return {"job_id": job_id, "parameters": crawl_job.parameters, "status": crawl_job.status, "number_of_accounts": crawl_job.number_of_accounts}
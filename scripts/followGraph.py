@@ -0,0 +1,403 @@
+"""
+this script contains the store of the follow graph discovered by the crawls through the top 5 following accounts of every scraped account
+every medium id gets an integer id and the following edges are kept in compressed sparse row arrays (indptr, indices) instead of nested dicts,
+the graph is saved in a numpy .npz file so the next crawls can start from the accounts it references without fetching the known accounts again.
+the graph can be exported as a csv edge list or as parquet node and edge tables to analyze it with other tools
+"""
+import os
+import csv
+import time
+import numpy as np
+import constants
+
+from array import array
+from crawlFrontier import CrawlFrontier
+
+
+class FollowGraph:
+    """
+    directed graph of the medium accounts where an edge goes from a scraped account to each account of its top 5 following accounts
+    """
+
+    def __init__(self):
+        #medium id of every integer id and integer id of every medium id
+        self.user_ids = []
+        self.node_index = dict()
+        #number of followers and time of the last scrape of every node, 0 for the nodes that were never scraped
+        self.num_followers = array('q')
+        self.crawled_at = array('d')
+        #following edges of the nodes in compressed sparse row format: the following nodes of the node i are indices[indptr[i]:indptr[i + 1]]
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        #following nodes of the nodes scraped since the arrays were last rebuilt, they replace the edges of these nodes in the arrays
+        self.pending_edges = dict()
+
+    def get_node(self, user_id: str) -> int:
+        """
+        this function returns the integer id of a medium id, adding the node to the graph if it is not in it yet
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id.
+
+        Returns
+        -------
+        int
+            the integer id of the node.
+
+        """
+        node = self.node_index.get(user_id)
+        if node is None:
+            node = len(self.user_ids)
+            self.node_index[user_id] = node
+            self.user_ids.append(user_id)
+            self.num_followers.append(0)
+            self.crawled_at.append(0.0)
+        return node
+
+    def add_account(self, account_data: dict, crawled_at: float = None):
+        """
+        this function records a scraped account and its following edges, replacing the edges of a previous scrape of the same account
+
+        Parameters
+        ----------
+        account_data : dict
+            the scraped data of the account with its medium id, number of followers and top 5 following accounts.
+        crawled_at : float, optional
+            the timestamp of the scrape. The default is None which uses the current time.
+
+        Returns
+        -------
+        None.
+
+        """
+        node = self.get_node(account_data["medium"])
+        self.num_followers[node] = account_data.get("num_followers") or 0
+        self.crawled_at[node] = crawled_at if crawled_at is not None else time.time()
+        following_nodes = [self.get_node(user_id) for user_id in account_data.get("following_top_5", []) if user_id]
+        self.pending_edges[node] = array('i', dict.fromkeys(following_nodes))
+
+    def compact(self):
+        """
+        this function rebuilds the compressed sparse row arrays with the edges of the nodes scraped since the last rebuild
+
+        Returns
+        -------
+        None.
+
+        """
+        number_of_nodes = len(self.user_ids)
+        if not self.pending_edges and len(self.indptr) == number_of_nodes + 1:
+            return
+        #edges of the arrays whose source was not scraped again
+        sources = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        kept_edges = ~np.isin(sources, np.fromiter(self.pending_edges.keys(), dtype=np.int32, count=len(self.pending_edges)))
+        pending_sources = np.concatenate([np.full(len(targets), node, dtype=np.int32) for node, targets in self.pending_edges.items()] + [np.zeros(0, dtype=np.int32)])
+        pending_targets = np.concatenate([np.frombuffer(targets, dtype=np.int32) for targets in self.pending_edges.values()] + [np.zeros(0, dtype=np.int32)])
+        sources = np.concatenate([sources[kept_edges], pending_sources])
+        targets = np.concatenate([self.indices[kept_edges], pending_targets])
+        #the stable sort keeps the order of the following accounts of every node
+        order = np.argsort(sources, kind="stable")
+        self.indices = targets[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(sources, minlength=number_of_nodes))]).astype(np.int64)
+        self.pending_edges = dict()
+
+    def get_following_nodes(self, node: int) -> np.ndarray:
+        """
+        this function returns the integer ids of the accounts followed by a node
+
+        Parameters
+        ----------
+        node : int
+            the integer id of the node.
+
+        Returns
+        -------
+        np.ndarray
+            the integer ids of the following nodes.
+
+        """
+        if node in self.pending_edges:
+            return np.frombuffer(self.pending_edges[node], dtype=np.int32)
+        if node + 1 < len(self.indptr):
+            return self.indices[self.indptr[node]:self.indptr[node + 1]]
+        return np.zeros(0, dtype=np.int32)
+
+    def get_following(self, user_id: str) -> list:
+        """
+        this function returns the top 5 following accounts of an account recorded in the graph
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id.
+
+        Returns
+        -------
+        list
+            the medium ids of the following accounts, empty if the account was never scraped.
+
+        """
+        node = self.node_index.get(user_id)
+        if node is None:
+            return []
+        return [self.user_ids[following_node] for following_node in self.get_following_nodes(node)]
+
+    def get_followers(self, user_id: str) -> list:
+        """
+        this function returns the scraped accounts having an account in their top 5 following accounts
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id.
+
+        Returns
+        -------
+        list
+            the medium ids of the scraped accounts following the account.
+
+        """
+        node = self.node_index.get(user_id)
+        if node is None:
+            return []
+        self.compact()
+        #the source of an edge is the row of the arrays containing its position
+        edge_positions = np.flatnonzero(self.indices == node)
+        return [self.user_ids[source] for source in np.searchsorted(self.indptr, edge_positions, side="right") - 1]
+
+    def get_neighborhood(self, user_id: str, depth: int = 1) -> list:
+        """
+        this function returns the accounts that can be reached from an account by following at most depth following edges
+
+        Parameters
+        ----------
+        user_id : str
+            the medium id.
+        depth : int, optional
+            the maximum number of edges between the account and the returned accounts. The default is 1.
+
+        Returns
+        -------
+        list
+            the medium ids of the reached accounts in breadth first order, without the account itself.
+
+        """
+        node = self.node_index.get(user_id)
+        if node is None:
+            return []
+        self.compact()
+        visited = np.zeros(len(self.user_ids), dtype=bool)
+        visited[node] = True
+        current_nodes = np.array([node], dtype=np.int32)
+        reached_nodes = []
+        for _ in range(depth):
+            #following nodes of all the nodes of the current hop at once
+            next_nodes = np.concatenate([self.indices[self.indptr[current_node]:self.indptr[current_node + 1]] for current_node in current_nodes] + [np.zeros(0, dtype=np.int32)])
+            next_nodes = next_nodes[~visited[next_nodes]]
+            #keep the first occurrence of every node in its order of discovery
+            next_nodes = next_nodes[np.sort(np.unique(next_nodes, return_index=True)[1])]
+            if len(next_nodes) == 0:
+                break
+            visited[next_nodes] = True
+            reached_nodes.extend(next_nodes.tolist())
+            current_nodes = next_nodes
+        return [self.user_ids[reached_node] for reached_node in reached_nodes]
+
+    def get_uncrawled_accounts(self) -> list:
+        """
+        this function returns the accounts referenced by the scraped accounts that were never scraped themselves,
+        the accounts followed by the most scraped accounts first
+
+        Returns
+        -------
+        list
+            list of the (medium id, number of followers of the most followed scraped account following it) tuples.
+
+        """
+        self.compact()
+        number_of_nodes = len(self.user_ids)
+        crawled_at = np.frombuffer(self.crawled_at, dtype=np.float64, count=number_of_nodes)
+        in_degrees = np.bincount(self.indices, minlength=number_of_nodes)
+        #priority of every node as in the crawl frontier: the number of followers of the account that led to it
+        sources = np.repeat(np.arange(number_of_nodes), np.diff(self.indptr))
+        priorities = np.zeros(number_of_nodes, dtype=np.int64)
+        np.maximum.at(priorities, self.indices, np.frombuffer(self.num_followers, dtype=np.int64, count=number_of_nodes)[sources])
+        uncrawled_nodes = np.flatnonzero(crawled_at == 0)
+        uncrawled_nodes = uncrawled_nodes[np.argsort(-in_degrees[uncrawled_nodes], kind="stable")]
+        return [(self.user_ids[node], int(priorities[node])) for node in uncrawled_nodes]
+
+    def create_frontier(self, excluded_ids=frozenset(), prioritize_by_followers: bool = False) -> CrawlFrontier:
+        """
+        this function creates a crawl frontier continuing the crawls recorded in the graph: the scraped accounts are marked as seen
+        so they are not fetched again and the referenced accounts that were never scraped are waiting to be scraped
+
+        Parameters
+        ----------
+        excluded_ids : TYPE, optional
+            ids that must never be scraped, like the accounts of the training dataset. The default is frozenset().
+        prioritize_by_followers : bool, optional
+            True to scrape first the accounts followed by the users with the most followers. The default is False.
+
+        Returns
+        -------
+        CrawlFrontier
+            the frontier of the new crawl.
+
+        """
+        frontier = CrawlFrontier(excluded_ids, prioritize_by_followers)
+        for node, crawled_at in enumerate(self.crawled_at):
+            if crawled_at:
+                frontier.mark_seen(self.user_ids[node])
+        for user_id, num_followers in self.get_uncrawled_accounts():
+            frontier.add([user_id], num_followers)
+        return frontier
+
+    def get_stats(self) -> dict:
+        """
+        this function returns the size of the graph
+
+        Returns
+        -------
+        dict
+            dictionnary containing the number of nodes, of scraped nodes and of edges.
+
+        """
+        self.compact()
+        return {"nodes": len(self.user_ids),
+                "crawled_nodes": int(np.count_nonzero(np.frombuffer(self.crawled_at, dtype=np.float64, count=len(self.user_ids)))),
+                "edges": len(self.indices)}
+
+    def save(self, file_path: str = None):
+        """
+        this function saves the graph in a numpy .npz file, written to a temporary file first and renamed so a crash never leaves a corrupted graph
+
+        Parameters
+        ----------
+        file_path : str, optional
+            the path of the file. The default is None which uses constants.FOLLOW_GRAPH_FILE.
+
+        Returns
+        -------
+        None.
+
+        """
+        file_path = file_path if file_path is not None else constants.FOLLOW_GRAPH_FILE
+        self.compact()
+        temporary_path = file_path + ".tmp"
+        with open(temporary_path, 'wb') as file:
+            #the medium ids are saved as one utf-8 buffer separated by new lines, they never contain new lines
+            np.savez_compressed(file,
+                                user_ids=np.frombuffer("\n".join(self.user_ids).encode("utf-8"), dtype=np.uint8),
+                                num_followers=np.frombuffer(self.num_followers, dtype=np.int64, count=len(self.user_ids)),
+                                crawled_at=np.frombuffer(self.crawled_at, dtype=np.float64, count=len(self.user_ids)),
+                                indptr=self.indptr,
+                                indices=self.indices)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str = None):
+        """
+        this function loads a graph saved with save
+
+        Parameters
+        ----------
+        file_path : str, optional
+            the path of the file. The default is None which uses constants.FOLLOW_GRAPH_FILE.
+
+        Returns
+        -------
+        FollowGraph
+            the loaded graph.
+
+        """
+        follow_graph = cls()
+        with np.load(file_path if file_path is not None else constants.FOLLOW_GRAPH_FILE) as graph_arrays:
+            user_ids = graph_arrays["user_ids"].tobytes().decode("utf-8")
+            follow_graph.user_ids = user_ids.split("\n") if user_ids else []
+            follow_graph.num_followers = array('q', graph_arrays["num_followers"].tobytes())
+            follow_graph.crawled_at = array('d', graph_arrays["crawled_at"].tobytes())
+            follow_graph.indptr = graph_arrays["indptr"]
+            follow_graph.indices = graph_arrays["indices"]
+        follow_graph.node_index = {user_id: node for node, user_id in enumerate(follow_graph.user_ids)}
+        return follow_graph
+
+    def export_edge_list(self, file_path: str):
+        """
+        this function writes the following edges of the graph in a csv file with one "source,target" line of medium ids per edge
+
+        Parameters
+        ----------
+        file_path : str
+            the path of the csv file.
+
+        Returns
+        -------
+        None.
+
+        """
+        self.compact()
+        with open(file_path, 'w', encoding='utf-8', newline='') as file:
+            csv_writer = csv.writer(file)
+            csv_writer.writerow(["source", "target"])
+            for source in range(len(self.indptr) - 1):
+                source_id = self.user_ids[source]
+                csv_writer.writerows((source_id, self.user_ids[target]) for target in self.indices[self.indptr[source]:self.indptr[source + 1]])
+
+    def export_parquet(self, nodes_file_path: str, edges_file_path: str):
+        """
+        this function writes the graph in two parquet files: the nodes with their integer id, medium id, number of followers and time of the last scrape,
+        and the edges with the integer ids of their source and target. pyarrow must be installed
+
+        Parameters
+        ----------
+        nodes_file_path : str
+            the path of the parquet file of the nodes.
+        edges_file_path : str
+            the path of the parquet file of the edges.
+
+        Returns
+        -------
+        None.
+
+        """
+        #pyarrow is only needed to export the graph so it is not imported with the module
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required to export the follow graph to parquet, install it or use export_edge_list")
+        self.compact()
+        number_of_nodes = len(self.user_ids)
+        nodes_table = pyarrow.table({"id": np.arange(number_of_nodes, dtype=np.int32),
+                                     "medium": self.user_ids,
+                                     "num_followers": np.frombuffer(self.num_followers, dtype=np.int64, count=number_of_nodes),
+                                     "crawled_at": np.frombuffer(self.crawled_at, dtype=np.float64, count=number_of_nodes)})
+        edges_table = pyarrow.table({"source": np.repeat(np.arange(number_of_nodes, dtype=np.int32), np.diff(self.indptr)),
+                                     "target": self.indices})
+        pyarrow.parquet.write_table(nodes_table, nodes_file_path)
+        pyarrow.parquet.write_table(edges_table, edges_file_path)
+
+
+def load_follow_graph(file_path: str = None) -> FollowGraph:
+    """
+    this function loads the saved follow graph, or returns an empty graph if it was never saved
+
+    Parameters
+    ----------
+    file_path : str, optional
+        the path of the file. The default is None which uses constants.FOLLOW_GRAPH_FILE.
+
+    Returns
+    -------
+    FollowGraph
+        the follow graph.
+
+    """
+    file_path = file_path if file_path is not None else constants.FOLLOW_GRAPH_FILE
+    if os.path.exists(file_path):
+        return FollowGraph.load(file_path)
+    return FollowGraph()
@@ -0,0 +1,348 @@
+"""
+this script contains the http layer used by the scraper to fetch the medium pages
+it sends the requests through a shared pooled session, limits the number of requests sent to each host with a token bucket,
+retries the requests that fail temporarily and revalidates the pages it has already seen with conditional requests
+"""
+import threading
+import time
+import zlib
+import requests
+import constants
+
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+
+#status codes of the responses that are worth retrying
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    rate limiter that allows a burst of requests and then refills its tokens at a constant rate
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        this function blocks until a token is available and consumes it
+
+        Returns
+        -------
+        None.
+
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            #sleep outside of the lock so the other threads can keep refilling and checking the bucket
+            time.sleep(wait_time)
+
+
+def create_session() -> requests.Session:
+    """
+    this function creates the http session shared by all the scraping threads.
+    the session keeps the connections alive between requests so the tcp and tls handshakes are only paid once per connection
+
+    Returns
+    -------
+    requests.Session
+        the pooled session.
+
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=constants.HTTP_POOL_SIZE, pool_maxsize=constants.HTTP_POOL_SIZE)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"})
+    return session
+
+
+#session shared by every request of the process
+http_session = create_session()
+
+#validators and compressed content of the pages already fetched, ordered from the least to the most recently used
+#only the content is kept, not the responses, so a page takes a fraction of its size in memory
+conditional_cache = OrderedDict()
+conditional_cache_lock = threading.Lock()
+
+#counters of the conditional requests answered with 304 and of the full downloads, and the size of the compressed pages kept
+http_stats = {"not_modified": 0, "downloaded": 0, "conditional_cache_bytes": 0}
+
+
+def get_conditional_headers(url: str) -> dict:
+    """
+    this function returns the If-None-Match and If-Modified-Since headers of a page that has already been fetched
+
+    Parameters
+    ----------
+    url : str
+        the url of the page to request.
+
+    Returns
+    -------
+    dict
+        the conditional headers, empty if the page has never been fetched or had no validators.
+
+    """
+    with conditional_cache_lock:
+        cached_page = conditional_cache.get(url)
+    if cached_page is None:
+        return {}
+    headers = dict()
+    if "ETag" in cached_page["validators"]:
+        headers["If-None-Match"] = cached_page["validators"]["ETag"]
+    if "Last-Modified" in cached_page["validators"]:
+        headers["If-Modified-Since"] = cached_page["validators"]["Last-Modified"]
+    return headers
+
+
+def build_cached_response(url: str, response: requests.Response, cached_page: dict) -> requests.Response:
+    """
+    this function rebuilds the response of a page revalidated with a 304 answer from its cached content
+
+    Parameters
+    ----------
+    url : str
+        the requested url.
+    response : requests.Response
+        the 304 response sent by the server.
+    cached_page : dict
+        the validators, encoding, content type and compressed content of the page.
+
+    Returns
+    -------
+    requests.Response
+        a 200 response holding the content of the page.
+
+    """
+    cached_response = requests.Response()
+    cached_response.status_code = 200
+    cached_response.url = url
+    cached_response.request = response.request
+    cached_response.headers.update(cached_page["validators"])
+    if cached_page["content_type"] is not None:
+        cached_response.headers["Content-Type"] = cached_page["content_type"]
+    cached_response.encoding = cached_page["encoding"]
+    cached_response._content = zlib.decompress(cached_page["content"])
+    return cached_response
+
+
+def store_conditional_page(url: str, conditional_page: dict):
+    """
+    this function keeps the validators and the compressed content of a page and evicts the least recently used pages
+    when there are more than constants.HTTP_CONDITIONAL_CACHE_SIZE pages or constants.HTTP_CONDITIONAL_CACHE_MAX_BYTES bytes, the lock must be held by the caller
+
+    Parameters
+    ----------
+    url : str
+        the requested url.
+    conditional_page : dict
+        the validators, encoding, content type and compressed content of the page.
+
+    Returns
+    -------
+    None.
+
+    """
+    previous_page = conditional_cache.pop(url, None)
+    if previous_page is not None:
+        http_stats["conditional_cache_bytes"] -= len(previous_page["content"])
+    conditional_cache[url] = conditional_page
+    http_stats["conditional_cache_bytes"] += len(conditional_page["content"])
+    while len(conditional_cache) > constants.HTTP_CONDITIONAL_CACHE_SIZE or http_stats["conditional_cache_bytes"] > constants.HTTP_CONDITIONAL_CACHE_MAX_BYTES:
+        _, evicted_page = conditional_cache.popitem(last=False)
+        http_stats["conditional_cache_bytes"] -= len(evicted_page["content"])
+
+
+def handle_conditional_response(url: str, response: requests.Response) -> requests.Response:
+    """
+    this function rebuilds the cached page when the server answered 304 and stores the validators and the content of the new page otherwise
+
+    Parameters
+    ----------
+    url : str
+        the requested url.
+    response : requests.Response
+        the response sent by the server.
+
+    Returns
+    -------
+    requests.Response
+        the response holding the content of the page, None if the server answered 304 but the page was evicted from the cache since the request was sent.
+
+    """
+    #the page is compressed and decompressed outside of the lock so the scraping threads do not wait for each other
+    conditional_page = None
+    if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+        conditional_page = {"validators": {header: response.headers[header] for header in ("ETag", "Last-Modified") if header in response.headers},
+                            "encoding": response.encoding,
+                            "content_type": response.headers.get("Content-Type"),
+                            "content": zlib.compress(response.content, 1)}
+    with conditional_cache_lock:
+        if response.status_code == 304 and url in conditional_cache:
+            http_stats["not_modified"] += 1
+            conditional_cache.move_to_end(url)
+            cached_page = conditional_cache[url]
+        elif response.status_code == 304:
+            return None
+        else:
+            cached_page = None
+            http_stats["downloaded"] += 1
+            if conditional_page is not None:
+                store_conditional_page(url, conditional_page)
+    if cached_page is not None:
+        return build_cached_response(url, response, cached_page)
+    return response
+
+
+def get_http_stats() -> dict:
+    """
+    this function returns the counters of the pages revalidated with a 304 and of the pages fully downloaded
+
+    Returns
+    -------
+    dict
+        dictionnary containing the counters and the number and compressed size of the pages kept for conditional requests.
+
+    """
+    with conditional_cache_lock:
+        return {"not_modified": http_stats["not_modified"], "downloaded": http_stats["downloaded"],
+                "conditional_cache_size": len(conditional_cache), "conditional_cache_bytes": http_stats["conditional_cache_bytes"]}
+
+
+def clear_conditional_cache():
+    """
+    this function removes the pages kept for conditional requests
+
+    Returns
+    -------
+    None.
+
+    """
+    with conditional_cache_lock:
+        conditional_cache.clear()
+        http_stats["conditional_cache_bytes"] = 0
+
+
+#dictionnary of the token buckets of every host, created on the first request to the host
+host_buckets = dict()
+host_buckets_lock = threading.Lock()
+
+
+def get_host_bucket(url: str) -> TokenBucket:
+    """
+    this function returns the token bucket that limits the requests sent to the host of the url
+
+    Parameters
+    ----------
+    url : str
+        the url that will be requested.
+
+    Returns
+    -------
+    TokenBucket
+        the token bucket of the host.
+
+    """
+    host = urlparse(url).netloc
+    with host_buckets_lock:
+        if host not in host_buckets:
+            host_buckets[host] = TokenBucket(constants.CRAWLER_REQUESTS_PER_SECOND, constants.CRAWLER_BURST_SIZE)
+        return host_buckets[host]
+
+
+def get_retry_delay(response, attempt: int) -> float:
+    """
+    this function returns the time to wait before retrying a request using the Retry-After header when the server sends one
+    and an exponential backoff otherwise
+
+    Parameters
+    ----------
+    response : requests.Response
+        the failed response or None if the request raised a connection error.
+    attempt : int
+        the number of the attempt that failed starting from 0.
+
+    Returns
+    -------
+    float
+        the delay in seconds.
+
+    """
+    if response is not None and response.headers.get("Retry-After", "").isdigit():
+        return float(response.headers["Retry-After"])
+    return constants.CRAWLER_BACKOFF_SECONDS * (2 ** attempt)
+
+
+def send_request(url: str, headers: dict) -> requests.Response:
+    """
+    this function sends a request through the shared session while respecting the rate limit of its host and retries the request on 429, 5xx and connection errors
+
+    Parameters
+    ----------
+    url : str
+        the url of the page to request.
+    headers : dict
+        the headers of the request.
+
+    Returns
+    -------
+    requests.Response
+        the successful response. an exception is raised if the request still fails after all the retries.
+
+    """
+    bucket = get_host_bucket(url)
+    for attempt in range(constants.CRAWLER_MAX_RETRIES + 1):
+        bucket.acquire()
+        try:
+            response = http_session.get(url, headers=headers, timeout=(constants.HTTP_CONNECT_TIMEOUT, constants.HTTP_READ_TIMEOUT))
+        except (requests.ConnectionError, requests.Timeout):
+            #raise the connection error if there are no retries left
+            if attempt == constants.CRAWLER_MAX_RETRIES:
+                raise
+            response = None
+        if response is not None and response.status_code not in RETRY_STATUS_CODES:
+            break
+        if attempt < constants.CRAWLER_MAX_RETRIES:
+            time.sleep(get_retry_delay(response, attempt))
+    response.raise_for_status()
+    return response
+
+
+def fetch_page(url: str) -> requests.Response:
+    """
+    this function requests a page with send_request.
+    pages already fetched are requested with conditional headers and a 304 answer returns the previously downloaded page
+
+    Parameters
+    ----------
+    url : str
+        the url of the page to request.
+
+    Returns
+    -------
+    requests.Response
+        the successful response. an exception is raised if the request still fails after all the retries.
+
+    """
+    page_response = handle_conditional_response(url, send_request(url, get_conditional_headers(url)))
+    if page_response is None:
+        #the page was evicted from the cache while it was revalidated, it is downloaded again once without conditional headers
+        response = send_request(url, dict())
+        page_response = handle_conditional_response(url, response)
+        if page_response is None:
+            raise requests.HTTPError("the server answered 304 to a request without conditional headers for url: " + url, response=response)
+    return page_response
@@ -1,31 +1,178 @@
+import time
+import json
+import queue
+import atexit
+import random
+import inspect
 import logging
+import logging.handlers
+import threading
+import functools
 import constants
 
 #variable that defines if the logging has started to set the logging configuration in the first attempt
 logging_started = False
+logging_lock = threading.Lock()
+
+#listener writing the log records put in the queue by the logging calls to the log file from a background thread
+log_listener = None
+
+#dictionnary of the call count, error count, total duration and latency histogram of every decorated function
+function_metrics = dict()
+metrics_lock = threading.Lock()
+
+#arguments of the decorated functions added to the context of the logged errors
+CONTEXT_ARGUMENTS = ("user_id", "first_user_id", "job_id")
 
 
 def start_logging():
     """
     this function is used to start the logging that will be used in the exception handler
+    the logging calls only put the records in a queue, the log file is written by a background thread so the decorated functions never wait for the disk
 
     Returns
     -------
     None.
 
     """
-    global logging_started
+    global logging_started, log_listener
     if(logging_started == False):
-        #if the logging is being started set the the directory of the logfile to the one defined in the constants folder
-        logging.basicConfig(filename=constants.LOGFILE_DIR, encoding='utf-8', level=logging.DEBUG, format='%(asctime)s %(message)s')
-        logging_started = True
-        
-        
+        with logging_lock:
+            if(logging_started == False):
+                #if the logging is being started set the the directory of the logfile to the one defined in the constants folder
+                file_handler = logging.FileHandler(constants.LOGFILE_DIR, encoding='utf-8')
+                file_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+                log_queue = queue.SimpleQueue()
+                log_listener = logging.handlers.QueueListener(log_queue, file_handler)
+                log_listener.start()
+                #write the records still in the queue when the process stops
+                atexit.register(log_listener.stop)
+                root_logger = logging.getLogger()
+                root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+                root_logger.setLevel(logging.DEBUG)
+                logging_started = True
+
+
+def record_call(function_name: str, duration: float, failed: bool):
+    """
+    this function adds a call of a decorated function to its metrics
+
+    Parameters
+    ----------
+    function_name : str
+        the name of the decorated function.
+    duration : float
+        the duration of the call in seconds.
+    failed : bool
+        True if the call raised an exception.
+
+    Returns
+    -------
+    None.
+
+    """
+    with metrics_lock:
+        metrics = function_metrics.get(function_name)
+        if metrics is None:
+            #one bucket per bound of the constants and a last bucket for the longer calls
+            metrics = {"calls": 0, "errors": 0, "total_seconds": 0.0, "buckets": [0] * (len(constants.LATENCY_HISTOGRAM_BUCKETS) + 1)}
+            function_metrics[function_name] = metrics
+        metrics["calls"] += 1
+        metrics["errors"] += failed
+        metrics["total_seconds"] += duration
+        bucket_index = 0
+        while bucket_index < len(constants.LATENCY_HISTOGRAM_BUCKETS) and duration > constants.LATENCY_HISTOGRAM_BUCKETS[bucket_index]:
+            bucket_index += 1
+        metrics["buckets"][bucket_index] += 1
+
+
+def get_function_metrics() -> dict:
+    """
+    this function returns the metrics of every decorated function called since the start of the process
+
+    Returns
+    -------
+    dict
+        dictionnary keyed by function name containing the number of calls, the number of errors, the total duration in seconds
+        and the number of calls of every bucket of the latency histogram.
+
+    """
+    with metrics_lock:
+        return {function_name: {"calls": metrics["calls"],
+                                "errors": metrics["errors"],
+                                "total_seconds": metrics["total_seconds"],
+                                "buckets": dict(zip([str(bound) for bound in constants.LATENCY_HISTOGRAM_BUCKETS] + ["+Inf"], metrics["buckets"]))}
+                for function_name, metrics in function_metrics.items()}
+
+
+def render_metrics() -> str:
+    """
+    this function returns the metrics of the decorated functions in the prometheus text format
+
+    Returns
+    -------
+    str
+        the calls, errors and latency histograms of the decorated functions.
+
+    """
+    lines = ["# HELP function_calls_total number of calls of the function",
+             "# TYPE function_calls_total counter"]
+    metrics_snapshot = get_function_metrics()
+    for function_name, metrics in metrics_snapshot.items():
+        lines.append('function_calls_total{function="' + function_name + '"} ' + str(metrics["calls"]))
+    lines += ["# HELP function_errors_total number of calls of the function that raised an exception",
+              "# TYPE function_errors_total counter"]
+    for function_name, metrics in metrics_snapshot.items():
+        lines.append('function_errors_total{function="' + function_name + '"} ' + str(metrics["errors"]))
+    lines += ["# HELP function_duration_seconds duration of the calls of the function",
+              "# TYPE function_duration_seconds histogram"]
+    for function_name, metrics in metrics_snapshot.items():
+        #the buckets of the prometheus histograms count all the calls shorter than their bound
+        cumulative_count = 0
+        for bound, count in metrics["buckets"].items():
+            cumulative_count += count
+            lines.append('function_duration_seconds_bucket{function="' + function_name + '",le="' + bound + '"} ' + str(cumulative_count))
+        lines.append('function_duration_seconds_sum{function="' + function_name + '"} ' + repr(metrics["total_seconds"]))
+        lines.append('function_duration_seconds_count{function="' + function_name + '"} ' + str(metrics["calls"]))
+    return "\n".join(lines) + "\n"
+
+
+def get_call_context(func, context_positions: dict, args: tuple, kwargs: dict) -> dict:
+    """
+    this function returns the values of the context arguments of a call of a decorated function
+
+    Parameters
+    ----------
+    func : TYPE
+        the decorated function.
+    context_positions : dict
+        the positions of the context arguments in the signature of the function keyed by their names.
+    args : tuple
+        the positional arguments of the call.
+    kwargs : dict
+        the keyword arguments of the call.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the name of the function and the value of every context argument of the call.
+
+    """
+    call_context = {"function": func.__name__}
+    for argument_name, position in context_positions.items():
+        if argument_name in kwargs:
+            call_context[argument_name] = kwargs[argument_name]
+        elif position < len(args):
+            call_context[argument_name] = args[position]
+    return call_context
+
+
 def exception_handler(func):
     """
     this function acts as a decorator that handles the exceptions thrown during the execution of the decorated functions
-    
-    this function takes the decorated functions, starts the logging, inputs log messages and logs exceptions in cases where they are returned
+
+    this function takes the decorated functions, starts the logging, records the number of calls and the latency of the functions,
+    logs a sample of the calls and logs exceptions with their context and traceback in cases where they are returned
 
     Parameters
     ----------
@@ -38,13 +185,28 @@ def exception_handler(func):
         this function returns itself as it acts as it is used as a decorator for another inner function.
 
     """
+    #positions of the arguments logged with the exceptions, looked up once when the function is decorated
+    argument_names = list(inspect.signature(func).parameters)
+    context_positions = {argument_name: argument_names.index(argument_name) for argument_name in CONTEXT_ARGUMENTS if argument_name in argument_names}
+
+    @functools.wraps(func)
     def inner_function(*args, **kwargs):
+        #call this function to start the logging and setup the logging configuration
+        start_logging()
+        start_time = time.perf_counter()
+        failed = False
         try:
-            #call this function to start the logging and setup the logging configuration
-            start_logging()
-            logging.debug("Launching the function " + func.__name__)
             return func(*args, **kwargs)
         except Exception as exception:
-            #if an exception is returned log the exception
-            logging.error("function returned an Exception with message: " + str(exception))
-    return inner_function
\ No newline at end of file
+            #if an exception is returned log the exception with the arguments identifying the call and the traceback
+            failed = True
+            call_context = get_call_context(func, context_positions, args, kwargs)
+            call_context["duration_seconds"] = time.perf_counter() - start_time
+            logging.error("function returned an Exception with message: " + str(exception) + " context: " + json.dumps(call_context, default=str), exc_info=True)
+        finally:
+            duration = time.perf_counter() - start_time
+            record_call(func.__name__, duration, failed)
+            #only a sample of the calls is logged so the log file does not grow with every scraped account
+            if constants.LOG_CALL_SAMPLE_RATE > 0 and random.random() < constants.LOG_CALL_SAMPLE_RATE:
+                logging.debug("Called the function " + func.__name__ + " in " + "%.6f" % duration + " seconds")
+    return inner_function
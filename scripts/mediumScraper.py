@@ -1,27 +1,36 @@
-import requests
-import re
 import json
+import time
+import hashlib
+import logging
+import itertools
 import constants
-import pickle
-import pandas as pd
+import httpClient
+import profileCache
+import trainingIndex
+import accountStorage
+import pageParser
+import crawlJobs
+import followGraph
+import modelRegistry
 
-from sklearn.metrics import classification_report, confusion_matrix
 from logHandling import exception_handler
-from bs4 import BeautifulSoup
-from copy import deepcopy
-from pymongo import MongoClient
+from crawlFrontier import CrawlFrontier
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 
 
 @exception_handler
-def get_medium_page_data(user_id: str) -> str:
+def get_medium_page_data(user_id: str, use_cache: bool = True) -> str:
     """
     this function takes the user id of a medium user and scrapes the related data to return it in a json format
+    the scraped data is served from the profile cache when the user has been scraped recently
 
     Parameters
     ----------
     user_id : str
         the user id of the medium account to scrape.
+    use_cache : bool, optional
+        False to ignore the cached data and always scrape the page. The default is True.
 
     Returns
     -------
@@ -29,62 +38,255 @@ def get_medium_page_data(user_id: str) -> str:
         string containing the json data of the medium user.
 
     """
-    #set the medium link and get the page data using the requests module
+    #return the cached data of the user if it was scraped recently
+    if(use_cache):
+        cached_user_data = profileCache.get_profile(user_id)
+        if cached_user_data is not None:
+            return cached_user_data
+    
+    #set the medium link and get the page data using the rate limited http client
     medium_link = constants.MEDIUM_URL + str(user_id)
-    medium_html_page = requests.get(medium_link)
+    medium_html_page = httpClient.fetch_page(medium_link)
     
-    #parse the page content with beautifulsoup
-    soup = BeautifulSoup(medium_html_page.content, 'html.parser')
-    #navigate to the right hand section of the medium page containing the user data
-    user_soup= soup.find('div', class_="ag dq ck cj")
-    #find the tags containing the user following information to be extracted
-    top_following_soup = user_soup.findAll('a', class_="au av aw ax ay az ba bb bc bd be bf bg bh bi")
-    #find the tag containing the nb of followers to be formated
-    nb_followers_soup = user_soup.find('span', class_="pw-follower-count").text.split(" ")[0]
+    #extract the user data from the page with the parser backend defined in the constants, with the charset sent by the server when there is one
+    page_encoding = medium_html_page.encoding if "charset" in medium_html_page.headers.get("Content-Type", "").lower() else None
+    user_data = pageParser.parse_medium_page(medium_html_page.content, user_id, medium_link, encoding=page_encoding)
     
-    #create the user_data dictionnary containing the scraped data
-    user_data = dict()
-    user_data["medium"] = user_id
-    user_data["name"] = user_soup.find('h2', class_="pw-author-name").text
+    #store the user data in the profile cache and return it in a json format
+    user_data_json = json.dumps(user_data)
+    profileCache.set_profile(user_id, user_data_json)
+    return user_data_json
     
-    #format the number of followers by transforming numbers like 14k and 1.2M to an integer like 14000 and 12000000
-    if "M" in nb_followers_soup: 
-        user_data["num_followers"] = int(float(nb_followers_soup.replace("M",""))*1000000)
-    elif "K" in nb_followers_soup:
-        user_data["num_followers"] = int(float(nb_followers_soup.replace("K",""))*1000)
-    else:
-        user_data["num_followers"] = int(nb_followers_soup)
-        
-    #list comprehension that finds links that contain @user_id? to extract the user_id of all the top 5 following
-    #this comprehension also accounts for cases where the link is formated as https://user_id.medium.com
-    user_data["following_top_5"] = [re.search('@(.*)?\?', following['href']).group(1) if ("/@" in following['href']) else re.search('https://(.*).medium', following['href']).group(1) if (".medium.com" in following['href']) else '' for following in top_following_soup if (following.find('h4'))]
+
+def get_description_hash(description: str) -> str:
+    """
+    this function returns the content hash of a description used to detect the descriptions that changed between two crawls
+
+    Parameters
+    ----------
+    description : str
+        the description of the account.
+
+    Returns
+    -------
+    str
+        the sha256 hash of the description.
+
+    """
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+def get_crawled_account_data(user_id: str, stored_accounts: dict = None, freshness_hours: float = None) -> dict:
+    """
+    this function returns the data of an account reached by a crawl.
+    in incremental mode the stored accounts scraped less than freshness_hours ago are returned without being fetched again,
+    the other accounts are fetched without the profile cache and stamped with their scraping time and the hash of their description
+
+    Parameters
+    ----------
+    user_id : str
+        the user id of the medium account.
+    stored_accounts : dict, optional
+        the stored accounts keyed by user id in incremental mode. The default is None.
+    freshness_hours : float, optional
+        the number of hours a stored account stays fresh. The default is None.
+
+    Returns
+    -------
+    dict
+        the data of the account or None if the scraping failed.
+
+    """
+    if stored_accounts is not None:
+        stored_account_data = stored_accounts.get(user_id)
+        if stored_account_data is not None and time.time() - stored_account_data.get("scraped_at", 0) < freshness_hours * 3600:
+            return dict(stored_account_data)
+    #in incremental mode the account is fetched from medium because the profile cache can hold data older than the freshness of the stored account
+    medium_account_json = get_medium_page_data(user_id, use_cache=stored_accounts is None)
+    #if the scraped data is not a string, the scraping has failed
+    if not isinstance(medium_account_json, str):
+        return None
+    account_data = json.loads(medium_account_json)
+    if stored_accounts is not None:
+        account_data["scraped_at"] = time.time()
+        account_data["description_hash"] = get_description_hash(account_data["description"])
+    return account_data
+
+
+def iter_medium_accounts(first_user_id: str, number_to_collect: int = 500, predict_account: bool = False, number_of_workers: int = None, prioritize_by_followers: bool = False, crawl_job = None, stored_accounts: dict = None, freshness_hours: float = None, follow_graph = None, frontier = None, crawl_status: dict = None):
+    """
+    this generator takes the user id to start with and yields the data of every collected account as soon as it has been scraped.
+    collect a number of accounts that are not in the training dataset starting from the initial account by adding all the unique top 5 following accounts from subsequent scraped users until the 
+    required number of accounts is reached or until there are no accounts left to scrape.
+    the accounts are scraped in breadth first order, or starting with the accounts followed by the users with the most followers if prioritize_by_followers is True.
+    the accounts are scraped concurrently in batches of number_of_workers accounts, each batch is predicted at once before being yielded.
+    when a crawl job is given its checkpoints are saved while the crawl runs, and a job loaded from a checkpoint continues from its saved frontier.
+    when stored accounts are given the crawl is incremental: the fresh stored accounts are not fetched again and the accounts whose description did not change keep their stored type.
+    when a follow graph is given every scraped account and its following accounts are recorded in it.
+
+    Parameters
+    ----------
+    first_user_id : str
+        the used id to start scraping data from to get other users.
+    number_to_collect : int, optional
+        the number of total users to collect. The default is 500.
+    predict_account : bool, optional
+        variable that defines whether the user type should be predicted or not. The default is False.
+    number_of_workers : int, optional
+        the number of accounts scraped concurrently. The default is None which uses constants.CRAWLER_WORKERS.
+    prioritize_by_followers : bool, optional
+        True to scrape first the accounts followed by the users with the most followers. The default is False.
+    crawl_job : crawlJobs.CrawlJob, optional
+        the job saving the checkpoints of the crawl. The default is None which does not save checkpoints.
+    stored_accounts : dict, optional
+        the stored accounts keyed by user id to crawl incrementally. The default is None.
+    freshness_hours : float, optional
+        the number of hours a stored account stays fresh in incremental mode. The default is None which uses constants.RECRAWL_FRESHNESS_HOURS.
+    follow_graph : followGraph.FollowGraph, optional
+        the graph recording the following edges of the scraped accounts. The default is None which does not record them.
+    frontier : CrawlFrontier, optional
+        the frontier to start the crawl from instead of first_user_id, like the frontier created from a follow graph. The default is None.
+    crawl_status : dict, optional
+        dictionnary filled when the crawl ends with its status, "completed", "frontier_exhausted" or "first_account_failed", and the number of accounts collected. The default is None.
+
+    Yields
+    ------
+    dict
+        the data of a collected medium account.
+
+    """
+    if number_of_workers is None:
+        number_of_workers = constants.CRAWLER_WORKERS
+    if freshness_hours is None:
+        freshness_hours = constants.RECRAWL_FRESHNESS_HOURS
+    #get the set of the medium ids of the accounts in the training dataset from the training index
+    training_id_set = trainingIndex.get_training_id_set()
     
-    #check if the user displays following data and if it is found form the standard all following link that follows this format https://medium.com/@user_id/following
-    user_data["all_following_link"] = ""
-    if user_soup.find('a', text=re.compile('see all', re.I)) is not None: 
-        user_data["all_following_link"] = medium_link + "/following"
-        
-    #check if the user has a description to save
-    user_data["description"] = ""
-    if "See all (" not in user_soup.findAll('p')[1].text and user_soup.findAll('p')[1].text != "Help":
-        user_data["description"] = u"" + user_soup.findAll('p')[1].text
-        
-    #check for links inside the description to create a list using the following comprehension
-    user_data["links_of_description"] = [description_link['href'] for description_link in user_soup.findAll('p')[1].findAll('a')]
-    #set the type tag to an empty string to fill it with a prediction or to manually label it later
-    user_data["type"] = ""
+    if crawl_job is not None and crawl_job.frontier is not None:
+        #continue the crawl of the job from the frontier and the number of accounts of its last checkpoint
+        frontier = crawl_job.frontier
+        collected_batch = []
+        number_collected = crawl_job.number_of_accounts
+    elif frontier is not None:
+        #start the crawl from the accounts waiting in the given frontier
+        collected_batch = []
+        number_collected = 0
+        if crawl_job is not None:
+            crawl_job.frontier = frontier
+    else:
+        #Scrape the data from the first account
+        first_account_data_dict = get_crawled_account_data(first_user_id, stored_accounts, freshness_hours)
+        #stop the crawl when the first account could not be scraped, there are no accounts to follow
+        if first_account_data_dict is None:
+            logging.warning("iter_medium_accounts: the first account " + str(first_user_id) + " could not be scraped")
+            if crawl_job is not None:
+                crawl_job.finish("first_account_failed")
+            if crawl_status is not None:
+                crawl_status.update({"status": "first_account_failed", "number_collected": 0})
+            return
+        if follow_graph is not None:
+            follow_graph.add_account(first_account_data_dict)
+        #add the list of top 5 following accounts to the frontier of accounts to scrape, every account is enqueued at most once
+        frontier = CrawlFrontier(training_id_set, prioritize_by_followers)
+        frontier.mark_seen(first_user_id)
+        frontier.add(first_account_data_dict["following_top_5"], first_account_data_dict["num_followers"])
+        #accounts scraped in the last batch that have not been yielded yet
+        collected_batch = [first_account_data_dict]
+        number_collected = 0
+        if crawl_job is not None:
+            crawl_job.frontier = frontier
     
-    #return the user data dict in a json format
-    return json.dumps(user_data)
+    #scrapes running in the pool keyed by their future, in the order they were started
+    in_flight_scrapes = dict()
+    executor = ThreadPoolExecutor(max_workers=max(1, number_of_workers))
+    crawl_stopped = False
+    try:
+        while True:
+            #predict the types of the accounts of the last batch at once if the parameter predict_account is set to true
+            #in incremental mode the accounts whose description did not change keep their stored type
+            accounts_to_predict = []
+            for account_data in (collected_batch if predict_account else []):
+                stored_account_data = stored_accounts.get(account_data["medium"]) if stored_accounts is not None else None
+                if stored_account_data is not None and stored_account_data.get("type") and get_description_hash(stored_account_data["description"]) == get_description_hash(account_data["description"]):
+                    account_data["type"] = stored_account_data["type"]
+                    account_data["verified"] = stored_account_data.get("verified", "False")
+                else:
+                    accounts_to_predict.append(account_data)
+            if(accounts_to_predict):
+                predicted_types = predict_medium_accounts([account_data["description"] for account_data in accounts_to_predict])
+                for account_data, predicted_type in zip(accounts_to_predict, predicted_types):
+                    account_data["type"] = predicted_type
+                    account_data["verified"] = "False"
+            #save the batch in the crawl job, the frontier already contains the following accounts of the batch and the accounts still being scraped
+            if crawl_job is not None:
+                crawl_job.record_accounts(collected_batch)
+            for account_data in collected_batch:
+                yield account_data
+            number_collected += len(collected_batch)
+            collected_batch = []
+            
+            #stop when the amount of account data collected has reached the required number of accounts
+            if(number_collected >= int(number_to_collect)):
+                break
+            
+            #start a new scrape as soon as a worker is free, with no more scrapes running than accounts still missing
+            while len(in_flight_scrapes) < min(number_of_workers, int(number_to_collect) - number_collected) and not frontier.is_exhausted():
+                user_id = frontier.pop()
+                in_flight_scrapes[executor.submit(get_crawled_account_data, user_id, stored_accounts, freshness_hours)] = user_id
+            
+            #stop when no accounts are left to scrape
+            if not in_flight_scrapes:
+                break
+            
+            #wait for the first scrapes to finish, a slow page only keeps its own worker busy
+            finished_scrapes, _ = wait(in_flight_scrapes, return_when=FIRST_COMPLETED)
+            #the finished scrapes are handled in the order they were started
+            for scrape_future in [scrape_future for scrape_future in in_flight_scrapes if scrape_future in finished_scrapes]:
+                frontier.mark_done(in_flight_scrapes.pop(scrape_future))
+                scraped_account_data_dict = scrape_future.result()
+                
+                #if the scraped data is not None, the scraping has succeeded
+                if(scraped_account_data_dict is not None):
+                    #record the following edges of every scraped account, including the accounts without description that are not collected
+                    if follow_graph is not None:
+                        follow_graph.add_account(scraped_account_data_dict)
+                    #if the scraped account does not have a description
+                    if(scraped_account_data_dict["description"] != "" and number_collected + len(collected_batch) < int(number_to_collect)):
+                        #add account data to the batch of scrapped data
+                        collected_batch.append(scraped_account_data_dict)
+                        #add the top 5 following accounts of the scrapped account to the frontier
+                        frontier.add(scraped_account_data_dict["following_top_5"], scraped_account_data_dict["num_followers"])
+    except GeneratorExit:
+        #the consumer stopped the crawl, the scrapes still running finish in the background instead of delaying the close of the generator
+        crawl_stopped = True
+        raise
+    finally:
+        #the scrapes that have not started are cancelled
+        executor.shutdown(wait=not crawl_stopped, cancel_futures=True)
     
+    #save the final status of the crawl job and give it to the caller
+    final_status = "completed" if number_collected >= int(number_to_collect) else "frontier_exhausted"
+    if crawl_job is not None:
+        crawl_job.finish(final_status)
+    if crawl_status is not None:
+        crawl_status.update({"status": final_status, "number_collected": number_collected})
+    #log the end of the crawl when it stopped because there were no accounts left to scrape
+    if(number_collected < int(number_to_collect)):
+        logging.warning("iter_medium_accounts: frontier exhausted after collecting " + str(number_collected) + " of " + str(number_to_collect) + " accounts starting from " + str(first_user_id))
+
 
 @exception_handler
-def collect_medium_accounts(first_user_id: str, number_to_collect: int = 500, predict_account: bool = False, store_accounts: bool = False, use_mongodb: bool = False) -> str:
+def collect_medium_accounts(first_user_id: str, number_to_collect: int = 500, predict_account: bool = False, store_accounts: bool = False, use_mongodb: bool = False, number_of_workers: int = None, prioritize_by_followers: bool = False, job_id: str = None, record_graph: bool = False, crawl_status: dict = None) -> str:
     """
-    this function takes the user id to start with and scrapes the data using the get_medium_page_data function.
+    this function takes the user id to start with and scrapes the data using the iter_medium_accounts generator.
     collect a number of accounts that are not in the training dataset starting from the initial account by adding all the unique top 5 following accounts from subsequent scraped users until the 
-    required number of accounts is reached.
-    this function can also prerdict the user type and store the outcome if desired
+    required number of accounts is reached or until there are no accounts left to scrape.
+    the accounts are scraped in breadth first order, or starting with the accounts followed by the users with the most followers if prioritize_by_followers is True.
+    the accounts can be scraped concurrently by several workers, the requests sent to medium are rate limited and retried by the http client.
+    this function can also prerdict the user type and store the outcome if desired, the accounts are stored in batches while the crawl runs
+    when a job id is given the crawl saves checkpoints and can be continued with resume_medium_crawl if it stops before the end
+    when record_graph is True the following edges of the scraped accounts are added to the follow graph saved in constants.FOLLOW_GRAPH_FILE
+    when a crawl_status dictionnary is given it tells the caller whether the crawl collected all the accounts or stopped because there were no accounts left to scrape
 
     Parameters
     ----------
@@ -97,7 +299,17 @@ def collect_medium_accounts(first_user_id: str, number_to_collect: int = 500, pr
     store_accounts : bool, optional
         variable to decide whether to store the accounts of not. The default is False.
     use_mongodb : bool, optional
-        variable to decide to store the accounts in a json in directory defined in the constants or in mongodb. The default is False.
+        variable to decide to store the accounts in a jsonl file in directory defined in the constants or in mongodb. The default is False.
+    number_of_workers : int, optional
+        the number of accounts scraped concurrently. The default is None which uses constants.CRAWLER_WORKERS.
+    prioritize_by_followers : bool, optional
+        True to scrape first the accounts followed by the users with the most followers. The default is False.
+    job_id : str, optional
+        the id of the crawl job saving the checkpoints of the crawl. The default is None which does not save checkpoints.
+    record_graph : bool, optional
+        True to record the following edges of the scraped accounts in the follow graph. The default is False.
+    crawl_status : dict, optional
+        dictionnary filled at the end of the crawl with its status, "completed", "frontier_exhausted" or "first_account_failed", and the number of accounts collected. The default is None.
 
     Returns
     -------
@@ -108,68 +320,204 @@ def collect_medium_accounts(first_user_id: str, number_to_collect: int = 500, pr
     #if the number to collect is lower than 1 stop the function
     if number_to_collect<1:
         return "provide a number greater than 0"
-    #Scrape the data from the first account
+    crawl_job = None
+    if job_id is not None:
+        crawl_job = crawlJobs.CrawlJob.create({"first_user_id": first_user_id, "number_to_collect": number_to_collect, "predict_account": predict_account, "store_accounts": store_accounts,
+                                               "use_mongodb": use_mongodb, "number_of_workers": number_of_workers, "prioritize_by_followers": prioritize_by_followers, "record_graph": record_graph}, job_id)
+    follow_graph = followGraph.load_follow_graph() if record_graph else None
+    account_iterator = iter_medium_accounts(first_user_id, number_to_collect, predict_account, number_of_workers, prioritize_by_followers, crawl_job, follow_graph=follow_graph, crawl_status=crawl_status)
+    return gather_medium_accounts(account_iterator, store_accounts, use_mongodb, follow_graph)
+
+
+def gather_medium_accounts(account_iterator, store_accounts: bool = False, use_mongodb: bool = False, follow_graph = None) -> str:
+    """
+    this function collects the accounts of a crawl in a list and stores them in batches while the crawl runs if desired
+    the follow graph recording the crawl is saved at the end, also when the crawl fails
+
+    Parameters
+    ----------
+    account_iterator : TYPE
+        the iterator of the collected accounts.
+    store_accounts : bool, optional
+        variable to decide whether to store the accounts of not. The default is False.
+    use_mongodb : bool, optional
+        variable to decide to store the accounts in a jsonl file in directory defined in the constants or in mongodb. The default is False.
+    follow_graph : followGraph.FollowGraph, optional
+        the graph recording the crawl. The default is None.
+
+    Returns
+    -------
+    str
+        string containing an array of user data formatted in json.
+
+    """
+    #if the parameter store_accounts is true the accounts are stored either in mongo or in a jsonl file in the directory provided in the contants folder
+    #the storage writes the accounts every constants.STORAGE_FLUSH_SIZE accounts so the accounts already collected are kept if the crawl fails
+    account_storage = accountStorage.get_account_storage(use_mongodb) if store_accounts else None
     account_data_list = []
-    first_account_data_dict = json.loads(get_medium_page_data(first_user_id))
-    #predict the type if the parameter predict_amount is true
-    if(predict_account):
-        #call the prediction function with the description of the scraped account
-        first_account_data_dict["type"] = predict_medium_account("None",first_account_data_dict["description"])
-        first_account_data_dict["verified"] = "False"
-    #add the list of top 5 following accounts to the list of accounts to scrape
-    account_data_list.append(first_account_data_dict)
-    accounts_to_scrape_list = deepcopy(first_account_data_dict["following_top_5"])
-    
-    #add all the medium ids of the accounts in the training dataset to a set of strings called account_id_set
-    account_id_set = set()
-    with open(constants.TRAINING_DATA_JSON, "r") as file:
-        training_data_json = json.loads(file.read())
-    for training_account in training_data_json:
-        account_id_set.add(training_account["medium"])
-     
-    #while the amount of account data collected is still lower than the required number of accounts continue scraping
-    while(len(account_data_list) < int(number_to_collect)):
-        
-        #if the medium id provided found in the list of accounts to scrape is a string and has not already been scraped call the scraping function
-        if(accounts_to_scrape_list[-1] and  accounts_to_scrape_list[-1] not in account_id_set):
-            medium_account_json = get_medium_page_data(accounts_to_scrape_list[-1])
-            
-            #if the scraped data is a string, the scraping has succeeded and we store the json data in a python dict 
-            if(isinstance(medium_account_json,str)):
-                scraped_account_data_dict = json.loads(medium_account_json)
-                
-                #if the scraped account does not have a description
-                if(scraped_account_data_dict["description"] != ""):
-                    
-                    #predict the account type using the prediction function is the parameter predict_account is set to true
-                    if(predict_account):
-                        #call the prediction function with the description of the scraped account
-                        scraped_account_data_dict["type"] = predict_medium_account("None",scraped_account_data_dict["description"])
-                        scraped_account_data_dict["verified"] = "False"
-                    
-                    #add account data to the list of scrapped data
-                    account_data_list.append(scraped_account_data_dict)
-                    #add the top 5 following accounts of the scrapped account to the list of accounts to scrape
-                    accounts_to_scrape_list[:0] = scraped_account_data_dict["following_top_5"]
-                    #add the account id to the set of scrapped account ids
-                    account_id_set.add(scraped_account_data_dict["medium"])
-        
-        #remove the last element of the accounts to scrape list because it has been treated
-        accounts_to_scrape_list.pop() 
-    
-    #if the parameter store_accounts is true call the store accounts function which stores the scraped accounts either in mongo
-    #or in a json file in the directory provided in the contants folder
-    if(store_accounts):
-        store_accounts_data(account_data_list, use_mongodb)
+    try:
+        for account_data in account_iterator:
+            account_data_list.append(account_data)
+            if account_storage is not None:
+                account_storage.write_account(account_data)
+    finally:
+        if account_storage is not None:
+            account_storage.close()
+        if follow_graph is not None:
+            follow_graph.save()
     
     #returns a string containing the json formatted accounts
     return json.dumps(account_data_list)
 
 
+@exception_handler
+def resume_medium_crawl(job_id: str) -> str:
+    """
+    this function continues a crawl job started by collect_medium_accounts from its last checkpoint with the same parameters
+    and returns all the accounts of the crawl, the ones collected before the checkpoint and the new ones
+
+    Parameters
+    ----------
+    job_id : str
+        the id of the crawl job.
+
+    Returns
+    -------
+    str
+        string containing an array of user data formatted in json.
+
+    """
+    crawl_job = crawlJobs.CrawlJob.load(job_id, trainingIndex.get_training_id_set())
+    parameters = crawl_job.parameters
+    previous_account_data_list = crawl_job.load_accounts()
+    new_account_iterator = iter([])
+    #only the crawls that stopped before their end are continued
+    #the jobs saved before the follow graph was introduced do not have the record_graph parameter
+    follow_graph = followGraph.load_follow_graph() if parameters.get("record_graph", False) else None
+    if crawl_job.status == "running":
+        new_account_iterator = iter_medium_accounts(parameters["first_user_id"], parameters["number_to_collect"], parameters["predict_account"],
+                                                    parameters["number_of_workers"], parameters["prioritize_by_followers"], crawl_job, follow_graph=follow_graph)
+    #the accounts of the checkpoint are stored again in case the crawl stopped before storing them, storing an account twice has no effect
+    return gather_medium_accounts(itertools.chain(previous_account_data_list, new_account_iterator), parameters["store_accounts"], parameters["use_mongodb"], follow_graph)
+
+
+@exception_handler
+def collect_medium_accounts_from_graph(number_to_collect: int = 500, predict_account: bool = False, store_accounts: bool = False, use_mongodb: bool = False, number_of_workers: int = None, prioritize_by_followers: bool = False) -> str:
+    """
+    this function continues the crawls recorded in the follow graph: the accounts referenced by the scraped accounts of the graph
+    but never scraped themselves are collected, the accounts followed by the most scraped accounts first, and the accounts already
+    in the graph are not fetched again. the new accounts and their following edges are added to the graph
+
+    Parameters
+    ----------
+    number_to_collect : int, optional
+        the number of total users to collect. The default is 500.
+    predict_account : bool, optional
+        variable that defines whether the user type should be predicted or not. The default is False.
+    store_accounts : bool, optional
+        variable to decide whether to store the accounts of not. The default is False.
+    use_mongodb : bool, optional
+        variable to decide to store the accounts in a jsonl file in directory defined in the constants or in mongodb. The default is False.
+    number_of_workers : int, optional
+        the number of accounts scraped concurrently. The default is None which uses constants.CRAWLER_WORKERS.
+    prioritize_by_followers : bool, optional
+        True to scrape first the accounts followed by the users with the most followers. The default is False.
+
+    Returns
+    -------
+    str
+        string containing an array of user data formatted in json.
+
+    """
+    if number_to_collect<1:
+        return "provide a number greater than 0"
+    follow_graph = followGraph.load_follow_graph()
+    frontier = follow_graph.create_frontier(trainingIndex.get_training_id_set(), prioritize_by_followers)
+    account_iterator = iter_medium_accounts(None, number_to_collect, predict_account, number_of_workers, prioritize_by_followers, follow_graph=follow_graph, frontier=frontier)
+    return gather_medium_accounts(account_iterator, store_accounts, use_mongodb, follow_graph)
+
+
+@exception_handler
+def recrawl_medium_accounts(first_user_id: str, number_to_collect: int = 500, use_mongodb: bool = False, freshness_hours: float = None, number_of_workers: int = None, prioritize_by_followers: bool = False) -> str:
+    """
+    this function runs an incremental crawl over the stored accounts: it follows the same accounts as collect_medium_accounts but only fetches again
+    the stored accounts older than freshness_hours, and only predicts again the accounts whose description changed.
+    the new and refreshed accounts are stored and a summary of the crawl is returned
+
+    Parameters
+    ----------
+    first_user_id : str
+        the used id to start scraping data from to get other users.
+    number_to_collect : int, optional
+        the number of total users to collect. The default is 500.
+    use_mongodb : bool, optional
+        variable to decide to read and store the accounts in the jsonl file in directory defined in the constants or in mongodb. The default is False.
+    freshness_hours : float, optional
+        the number of hours a stored account stays fresh. The default is None which uses constants.RECRAWL_FRESHNESS_HOURS.
+    number_of_workers : int, optional
+        the number of accounts scraped concurrently. The default is None which uses constants.CRAWLER_WORKERS.
+    prioritize_by_followers : bool, optional
+        True to scrape first the accounts followed by the users with the most followers. The default is False.
+
+    Returns
+    -------
+    str
+        string containing the number of accounts added, updated with a new description, refreshed with an unchanged description and still fresh, formatted in json.
+
+    """
+    account_storage = accountStorage.get_account_storage(use_mongodb)
+    #the last stored version of every account, the jsonl file can contain several versions of the same account
+    stored_accounts = {account_data["medium"]: account_data for account_data in account_storage.iter_accounts()}
+    
+    recrawl_summary = {"added": 0, "updated": 0, "unchanged": 0, "fresh": 0}
+    try:
+        for account_data in iter_medium_accounts(first_user_id, number_to_collect, True, number_of_workers, prioritize_by_followers, stored_accounts=stored_accounts, freshness_hours=freshness_hours):
+            stored_account_data = stored_accounts.get(account_data["medium"])
+            if stored_account_data is None:
+                recrawl_summary["added"] += 1
+            elif account_data.get("scraped_at") == stored_account_data.get("scraped_at"):
+                #the fresh accounts were not fetched so there is nothing new to store
+                recrawl_summary["fresh"] += 1
+                continue
+            elif get_description_hash(stored_account_data["description"]) == account_data["description_hash"]:
+                recrawl_summary["unchanged"] += 1
+            else:
+                recrawl_summary["updated"] += 1
+            account_storage.write_account(account_data)
+    finally:
+        account_storage.close()
+    
+    logging.info("recrawl_medium_accounts: " + json.dumps(recrawl_summary))
+    return json.dumps(recrawl_summary)
+
+
+def get_prediction_cache_key(description: str, model_version: str) -> str:
+    """
+    this function returns the key of a description in the prediction memo.
+    the description is lowercased and its whitespaces are collapsed like the count vectorizer does, so descriptions with the same words share their prediction
+
+    Parameters
+    ----------
+    description : str
+        the description of the account.
+    model_version : str
+        the version of the model making the prediction.
+
+    Returns
+    -------
+    str
+        the key made of the model version and the sha1 hash of the normalized description.
+
+    """
+    normalized_description = " ".join((description or "").lower().split())
+    return model_version + ":" + hashlib.sha1(normalized_description.encode("utf-8")).hexdigest()
+
+
 @exception_handler
 def predict_medium_account(user_id: str, description: str = None) -> str:
     """
-    this function opens the fitted prediction model and text count vectorizer to prepare the data of an account and return the predicted type. 
+    this function uses the fitted prediction model and text count vectorizer loaded by the model registry to prepare the data of an account and return the predicted type. 
+    the predictions are memoized by predict_medium_accounts.
     the predicted type can either be "person" or "company".
     the function can take the user_id and scrape the user to predict or directly make a prediction based on a given description.
     if a description is provided the user id is ignored and the description is used for the prediction instead.
@@ -187,13 +535,6 @@ def predict_medium_account(user_id: str, description: str = None) -> str:
         label of the account type. can either be "person" or "company".
 
     """
-    #open the saved prediction model
-    with open(constants.MODEL_NAME, 'rb') as file:
-        prediction_model = pickle.load(file)
-    #open the count vectorizer that prepares the text data
-    with open(constants.VECTORIZER_NAME, 'rb') as file:
-        count_vectorizer = pickle.load(file)
-        
     #if no description is provided the account data will be scraped using the get_medium_page_data and the provided user_id
     if(description == None):
         json_data = get_medium_page_data(user_id)
@@ -202,12 +543,60 @@ def predict_medium_account(user_id: str, description: str = None) -> str:
     else:
         description_string = description
         
-    #vectorize and prepare the text data contained in the description using the opened vectorizer
-    vectorized_description = count_vectorizer.transform([u""+description_string])
+    #return the predicted type of the account using the memoized batch prediction
+    return predict_medium_accounts([description_string])[0]
     
-    #return the predicted type of the account
-    return str(prediction_model.predict(vectorized_description)[0])
+
+@exception_handler
+def predict_medium_accounts(descriptions: list, with_probability: bool = False) -> list:
+    """
+    this function predicts the type of many accounts at once by vectorizing all the descriptions in a single sparse matrix
+    and calling the prediction model one time for the whole batch.
+    the predictions are memoized by normalized description and model version so repeated descriptions are only predicted once.
+
+    Parameters
+    ----------
+    descriptions : list
+        list of the descriptions of the medium accounts to predict.
+    with_probability : bool, optional
+        True to also return the probability of each predicted type. The default is False.
+
+    Returns
+    -------
+    list
+        list of the labels predicted in the same order as the descriptions. can either be "person" or "company".
+        if with_probability is True the list contains dictionnaries with the keys "type" and "probability".
+
+    """
+    if len(descriptions) == 0:
+        return []
+    #get the prediction model, the count vectorizer and their version kept in memory by the model registry
+    prediction_model, count_vectorizer, model_version = modelRegistry.load_versioned_model()
     
+    #look for the memoized predictions, the key contains the model version so a new model never uses the predictions of the old one
+    cache_keys = [get_prediction_cache_key(description, model_version) for description in descriptions]
+    predictions = [modelRegistry.prediction_cache.get(cache_key) for cache_key in cache_keys]
+    
+    #predict the descriptions missing from the memo, each distinct description only once
+    missing_descriptions = dict()
+    for cache_key, description, prediction in zip(cache_keys, descriptions, predictions):
+        if prediction is None:
+            missing_descriptions[cache_key] = description
+    if missing_descriptions:
+        #vectorize all the missing descriptions in one sparse matrix
+        vectorized_descriptions = count_vectorizer.transform([u"" + (description or "") for description in missing_descriptions.values()])
+        #the predicted type is the type with the highest probability of each row
+        probabilities = prediction_model.predict_proba(vectorized_descriptions)
+        new_predictions = dict()
+        for cache_key, row in zip(missing_descriptions, probabilities):
+            new_predictions[cache_key] = {"type": str(prediction_model.classes_[row.argmax()]), "probability": float(row.max())}
+            modelRegistry.prediction_cache.set(cache_key, new_predictions[cache_key])
+        predictions = [prediction if prediction is not None else new_predictions[cache_key] for cache_key, prediction in zip(cache_keys, predictions)]
+    
+    if(with_probability):
+        return [dict(prediction) for prediction in predictions]
+    return [prediction["type"] for prediction in predictions]
+
 
 @exception_handler
 def calculate_model_scores():
@@ -222,10 +611,13 @@ def calculate_model_scores():
         an array that shows the confusion matrix of the model.
 
     """
+    #pandas and the sklearn metrics are only imported here so the processes serving predictions do not load them
+    import pandas as pd
+    from sklearn.metrics import classification_report, confusion_matrix
     with open(constants.TESTING_DATA_JSON, 'r') as file:
         testing_accounts_data = json.loads(file.read())
     testing_dataframe = pd.DataFrame(testing_accounts_data)
-    testing_dataframe["prediction"] = testing_dataframe["description"].map(lambda description: predict_medium_account("None",description))
+    testing_dataframe["prediction"] = predict_medium_accounts(testing_dataframe["description"].tolist())
     class_report = classification_report(testing_dataframe.type, testing_dataframe.prediction)
     conf_matrix = confusion_matrix(testing_dataframe.type, testing_dataframe.prediction)
     
@@ -233,40 +625,36 @@ def calculate_model_scores():
 
     
 @exception_handler  
-def store_accounts_data(account_data_list: list, use_mongodb: bool = False):
+def store_accounts_data(account_data_list: list, use_mongodb: bool = False, mongo_client = None):
     """
-    this function is used to store the accounts data either in mongodb or in a file and directory specified in constants.py
+    this function is used to store the accounts data either in mongodb or in a jsonl file and directory specified in constants.py
+    mongodb upserts the accounts with batched bulk writes and the jsonl file gets one line appended per account
 
     Parameters
     ----------
     account_data_list : list
         the list of the accounts to store.
     use_mongodb : bool, optional
-        True to use mongodb and false to store in a json file in the directory provided in constants.py. The default is False.
+        True to use mongodb and false to store in a jsonl file in the directory provided in constants.py. The default is False.
+    mongo_client : TYPE, optional
+        the mongo client to use instead of connecting to constants.MONGO_URI. The default is None.
 
     Returns
     -------
     None.
 
     """
-    if(use_mongodb):
-        #connect to the mongo client, database and collection and insert or update the accounts found
-        client = MongoClient(constants.MONGO_URI)
-        database = client[constants.DATABASE_NAME]
-        collection = database[constants.COLLECTION_NAME]
-        for account in account_data_list:
-            collection.update({"medium": account["medium"]}, account, upsert= True)
-    else:
-        #store the account list in a json file in the directory provided in constants.USER_DATA_JSON
-        account_data_json = json.dumps(account_data_list, indent = 7)
-        with open(constants.USER_DATA_JSON, 'a') as file:
-            file.write(account_data_json)
+    account_storage = accountStorage.get_account_storage(use_mongodb, mongo_client)
+    for account_data in account_data_list:
+        account_storage.write_account(account_data)
+    account_storage.close()
             
             
 @exception_handler  
 def account_is_in_trainingdataset(user_id: str) ->bool:
     """
     function that takes the user id and returns true if the user was used in the training dataset of the model and false otherwise
+    the lookup is made in the training index which only parses the training dataset again when the file changes
 
     Parameters
     ----------
@@ -279,9 +667,4 @@ def account_is_in_trainingdataset(user_id: str) ->bool:
         true if the user is in the training database. false in the other case.
 
     """
-    with open(constants.TRAINING_DATA_JSON, "r") as file:
-        training_data_json = json.loads(file.read())
-    for account_data in training_data_json:
-        if user_id == account_data["medium"]:
-            return True
-    return False
\ No newline at end of file
+    return user_id in trainingIndex.get_training_id_set()
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+this script contains the process wide registry that keeps the prediction model and the text vectorizer loaded in memory
+the model files are only unpickled again when their modification time changes on disk,
+or when the training pipeline publishes a new model version in the manifest constants.MODEL_MANIFEST
+the registry also holds the memo of the predictions made with the loaded model, emptied every time a new model is loaded
+"""
+import os
+import json
+import pickle
+import threading
+import time
+import constants
+
+from profileCache import LRUCache
+
+#lock that prevents two threads from loading the model files at the same time
+registry_lock = threading.Lock()
+
+#dictionnary holding the loaded model, vectorizer and version in a single tuple replaced at once, and the information describing the loaded version
+loaded_model_data = {"model": (None, None, None), "load_time": None, "loaded_at": None, "files": (None, None)}
+
+#memo of the predictions keyed by the model version and the hash of the normalized description
+prediction_cache = LRUCache(constants.PREDICTION_CACHE_SIZE)
+
+
+#last manifest read from the disk with its modification time in a single tuple replaced at once, the manifest is only read again when it changes
+loaded_manifest = {"manifest": (None, None)}
+
+
+def get_model_files() -> tuple:
+    """
+    this function returns the files of the model to load and their version.
+    the files and the version come from the manifest of the training pipeline when it exists,
+    otherwise the files are the ones of the constants and the version is built from their modification times
+
+    Returns
+    -------
+    tuple
+        the path of the model file, the path of the vectorizer file and a version string that changes every time the model is replaced.
+
+    """
+    try:
+        manifest_mtime = os.stat(constants.MODEL_MANIFEST).st_mtime_ns
+    except FileNotFoundError:
+        manifest_mtime = None
+    if manifest_mtime is not None:
+        loaded_mtime, manifest = loaded_manifest["manifest"]
+        if loaded_mtime != manifest_mtime:
+            with open(constants.MODEL_MANIFEST, 'r') as file:
+                manifest = json.loads(file.read())
+            loaded_manifest["manifest"] = (manifest_mtime, manifest)
+        #the paths of the manifest are relative to the folder of the manifest
+        manifest_dir = os.path.dirname(constants.MODEL_MANIFEST)
+        return os.path.join(manifest_dir, manifest["model_file"]), os.path.join(manifest_dir, manifest["vectorizer_file"]), manifest["version"]
+    model_mtime = os.stat(constants.MODEL_NAME).st_mtime_ns
+    vectorizer_mtime = os.stat(constants.VECTORIZER_NAME).st_mtime_ns
+    return constants.MODEL_NAME, constants.VECTORIZER_NAME, str(model_mtime) + "-" + str(vectorizer_mtime)
+
+
+def get_model_files_version() -> str:
+    """
+    this function returns the version of the model files on disk
+
+    Returns
+    -------
+    str
+        version string that changes every time the model files are replaced or a new model is published.
+
+    """
+    return get_model_files()[2]
+
+
+def load_versioned_model() -> tuple:
+    """
+    this function returns the prediction model, the count vectorizer and their version, unpickling them only on the first call
+    or when the files on disk or the published model version have changed since they were last loaded
+
+    Returns
+    -------
+    tuple
+        the prediction model, the count vectorizer and the version of the model files.
+
+    """
+    model_file, vectorizer_file, version = get_model_files()
+    #fast path: the loaded model is still up to date so no lock is needed
+    loaded_model = loaded_model_data["model"]
+    if loaded_model[2] == version:
+        return loaded_model
+
+    with registry_lock:
+        #another thread may have reloaded the model while this one was waiting for the lock
+        if loaded_model_data["model"][2] != version:
+            load_start = time.perf_counter()
+            with open(model_file, 'rb') as file:
+                prediction_model = pickle.load(file)
+            with open(vectorizer_file, 'rb') as file:
+                count_vectorizer = pickle.load(file)
+            loaded_model_data.update({"model": (prediction_model, count_vectorizer, version),
+                                      "load_time": time.perf_counter() - load_start,
+                                      "loaded_at": time.time(),
+                                      "files": (model_file, vectorizer_file)})
+            #the memoized predictions of the previous model are not valid anymore
+            prediction_cache.clear()
+        return loaded_model_data["model"]
+
+
+def load_model():
+    """
+    this function returns the prediction model and the count vectorizer kept in memory, reloading them if the files on disk have changed
+
+    Returns
+    -------
+    tuple
+        the prediction model and the count vectorizer.
+
+    """
+    prediction_model, count_vectorizer, _ = load_versioned_model()
+    return prediction_model, count_vectorizer
+
+
+def get_model_info() -> dict:
+    """
+    this function returns the information describing the model currently loaded in memory
+
+    Returns
+    -------
+    dict
+        dictionnary containing the model version, the time it took to load it in seconds and the timestamp of the load.
+
+    """
+    return {"version": loaded_model_data["model"][2],
+            "load_time_seconds": loaded_model_data["load_time"],
+            "loaded_at": loaded_model_data["loaded_at"],
+            "model_file": loaded_model_data["files"][0],
+            "vectorizer_file": loaded_model_data["files"][1]}
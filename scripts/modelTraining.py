@@ -0,0 +1,319 @@
+"""
+this script contains the training pipeline of the prediction model
+the labeled accounts are streamed in chunks from a json file, a jsonl file or mongodb and fitted with a stateless hashing vectorizer
+and an SGD logistic regression updated with partial_fit, so the memory used does not depend on the number of accounts.
+the trained model is evaluated on the testing dataset and published as a new version in its own folder of constants.MODELS_DIR,
+the manifest constants.MODEL_MANIFEST is then replaced in one atomic rename so the model registry of every process loads the new version
+"""
+import os
+import json
+import time
+import uuid
+import random
+import pickle
+import itertools
+import constants
+import accountStorage
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+#types of account predicted by the model
+ACCOUNT_TYPES = ["company", "person"]
+
+
+def iter_json_file(file_path: str, read_size: int = 1 << 20):
+    """
+    this generator streams the objects of a json file containing an array of objects without loading the whole file
+
+    Parameters
+    ----------
+    file_path : str
+        the path of the json file.
+    read_size : int, optional
+        the number of characters read from the file at a time. The default is 1 << 20.
+
+    Yields
+    ------
+    dict
+        the objects of the array in the order of the file.
+
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = file.read(read_size).lstrip()
+        if not buffer.startswith("["):
+            raise ValueError("the file " + file_path + " does not contain a json array")
+        buffer = buffer[1:]
+        while True:
+            #remove the separator between two objects
+            buffer = buffer.lstrip()
+            if buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                json_object, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                #the next object is not entirely in the buffer yet
+                next_characters = file.read(read_size)
+                if not next_characters:
+                    raise
+                buffer += next_characters
+                continue
+            yield json_object
+            buffer = buffer[end:]
+
+
+def iter_labeled_accounts(source: str = "json", file_path: str = None, mongo_client = None):
+    """
+    this generator streams the labeled accounts of a dataset, skipping the accounts collected by the crawler
+    whose type was predicted by the model and not verified ("verified": "False").
+    an account written several times to a jsonl file is read in its last version only
+
+    Parameters
+    ----------
+    source : str, optional
+        "json" for a json array file, "jsonl" for a file with one account per line or "mongodb" for the accounts collection. The default is "json".
+    file_path : str, optional
+        the path of the json or jsonl file. The default is None which reads constants.TRAINING_DATA_JSON or constants.USER_DATA_JSONL.
+    mongo_client : TYPE, optional
+        the mongo client to use instead of connecting to constants.MONGO_URI. The default is None.
+
+    Yields
+    ------
+    dict
+        the data of a labeled account.
+
+    """
+    if source == "json":
+        accounts = iter_json_file(file_path if file_path is not None else constants.TRAINING_DATA_JSON)
+    elif source == "jsonl":
+        #the accounts re-appended by the recrawls are read in their last version only
+        accounts = accountStorage.JsonlAccountStorage(file_path).iter_latest_accounts()
+    elif source == "mongodb":
+        accounts = accountStorage.MongoAccountStorage(mongo_client).iter_accounts()
+    else:
+        raise ValueError("unknown training data source " + str(source) + ", use json, jsonl or mongodb")
+    for account_data in accounts:
+        if str(account_data.get("verified", "True")) == "False" or account_data.get("type") not in ACCOUNT_TYPES:
+            continue
+        yield account_data
+
+
+def iter_chunks(iterable, chunk_size: int):
+    """
+    this generator groups the items of an iterable in lists of chunk_size items
+
+    Parameters
+    ----------
+    iterable : TYPE
+        the items to group.
+    chunk_size : int
+        the number of items of every chunk, the last chunk can be smaller.
+
+    Yields
+    ------
+    list
+        the next chunk of items.
+
+    """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def create_vectorizer() -> HashingVectorizer:
+    """
+    this function creates the vectorizer of the descriptions. the hashing vectorizer has no vocabulary to fit
+    so every chunk of accounts is vectorized the same way, the counts stay positive like the ones of the count vectorizer
+
+    Returns
+    -------
+    HashingVectorizer
+        the vectorizer.
+
+    """
+    return HashingVectorizer(n_features=constants.TRAINING_HASH_FEATURES, alternate_sign=False)
+
+
+def train_model(source: str = "json", file_path: str = None, mongo_client = None, chunk_size: int = None, number_of_epochs: int = None) -> tuple:
+    """
+    this function trains the prediction model chunk by chunk on the labeled accounts of a dataset
+
+    Parameters
+    ----------
+    source : str, optional
+        the source of the labeled accounts, "json", "jsonl" or "mongodb". The default is "json".
+    file_path : str, optional
+        the path of the json or jsonl file. The default is None.
+    mongo_client : TYPE, optional
+        the mongo client to use instead of connecting to constants.MONGO_URI. The default is None.
+    chunk_size : int, optional
+        the number of accounts fitted at a time. The default is None which uses constants.TRAINING_CHUNK_SIZE.
+    number_of_epochs : int, optional
+        the number of passes over the dataset. The default is None which uses constants.TRAINING_EPOCHS.
+
+    Returns
+    -------
+    tuple
+        the trained model, the vectorizer and the number of accounts of the dataset.
+
+    """
+    chunk_size = chunk_size if chunk_size is not None else constants.TRAINING_CHUNK_SIZE
+    number_of_epochs = number_of_epochs if number_of_epochs is not None else constants.TRAINING_EPOCHS
+    vectorizer = create_vectorizer()
+    prediction_model = SGDClassifier(loss="log_loss", alpha=constants.TRAINING_ALPHA, random_state=0)
+    #the accounts are shuffled inside every chunk because the datasets can be sorted by type
+    chunk_shuffler = random.Random(0)
+    number_of_accounts = 0
+    for epoch in range(number_of_epochs):
+        number_of_accounts = 0
+        for account_chunk in iter_chunks(iter_labeled_accounts(source, file_path, mongo_client), chunk_size):
+            chunk_shuffler.shuffle(account_chunk)
+            vectorized_descriptions = vectorizer.transform([u"" + (account_data["description"] or "") for account_data in account_chunk])
+            prediction_model.partial_fit(vectorized_descriptions, [account_data["type"] for account_data in account_chunk], classes=ACCOUNT_TYPES)
+            number_of_accounts += len(account_chunk)
+        if number_of_accounts == 0:
+            raise ValueError("the training dataset does not contain any labeled account")
+    return prediction_model, vectorizer, number_of_accounts
+
+
+def evaluate_model(prediction_model, vectorizer, testing_file_path: str = None) -> dict:
+    """
+    this function evaluates a model on the testing dataset
+
+    Parameters
+    ----------
+    prediction_model : TYPE
+        the trained model.
+    vectorizer : TYPE
+        the vectorizer of the model.
+    testing_file_path : str, optional
+        the path of the json testing dataset. The default is None which uses constants.TESTING_DATA_JSON.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the weighted f1-score, the classification report and the confusion matrix of the model.
+
+    """
+    from sklearn.metrics import classification_report, confusion_matrix
+    account_types = []
+    predictions = []
+    testing_accounts = iter_labeled_accounts("json", testing_file_path if testing_file_path is not None else constants.TESTING_DATA_JSON)
+    for account_chunk in iter_chunks(testing_accounts, constants.TRAINING_CHUNK_SIZE):
+        account_types += [account_data["type"] for account_data in account_chunk]
+        predictions += prediction_model.predict(vectorizer.transform([u"" + (account_data["description"] or "") for account_data in account_chunk])).tolist()
+    class_report = classification_report(account_types, predictions, labels=ACCOUNT_TYPES, output_dict=True, zero_division=0)
+    return {"weighted_f1_score": class_report["weighted avg"]["f1-score"],
+            "classification_report": class_report,
+            "confusion_matrix": confusion_matrix(account_types, predictions, labels=ACCOUNT_TYPES).tolist()}
+
+
+def write_file_durably(file_path: str, content: bytes):
+    """
+    this function writes a file and waits until its content is on the disk
+
+    Parameters
+    ----------
+    file_path : str
+        the path of the file.
+    content : bytes
+        the content of the file.
+
+    Returns
+    -------
+    None.
+
+    """
+    with open(file_path, 'wb') as file:
+        file.write(content)
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def publish_model(prediction_model, vectorizer, model_metadata: dict) -> str:
+    """
+    this function publishes a trained model as a new version. the model and the vectorizer are written to a new folder
+    and the manifest pointing to them is written to a temporary file and renamed, so the registry never loads a half written version
+
+    Parameters
+    ----------
+    prediction_model : TYPE
+        the trained model.
+    vectorizer : TYPE
+        the vectorizer of the model.
+    model_metadata : dict
+        the information saved in the manifest with the version, like the training parameters and the evaluation of the model.
+
+    Returns
+    -------
+    str
+        the version of the published model.
+
+    """
+    version = time.strftime("%Y%m%d%H%M%S") + "-" + uuid.uuid4().hex[:8]
+    version_dir = os.path.join(constants.MODELS_DIR, version)
+    os.makedirs(version_dir)
+    write_file_durably(os.path.join(version_dir, "predictionModel.pkl"), pickle.dumps(prediction_model))
+    write_file_durably(os.path.join(version_dir, "vectorizer.pkl"), pickle.dumps(vectorizer))
+    #the paths of the manifest are relative to the folder of the manifest
+    manifest_dir = os.path.dirname(constants.MODEL_MANIFEST)
+    manifest = dict(model_metadata)
+    manifest.update({"version": version,
+                     "model_file": os.path.relpath(os.path.join(version_dir, "predictionModel.pkl"), manifest_dir),
+                     "vectorizer_file": os.path.relpath(os.path.join(version_dir, "vectorizer.pkl"), manifest_dir),
+                     "published_at": time.time()})
+    write_file_durably(constants.MODEL_MANIFEST + ".tmp", json.dumps(manifest, indent=4).encode("utf-8"))
+    os.replace(constants.MODEL_MANIFEST + ".tmp", constants.MODEL_MANIFEST)
+    return version
+
+
+def run_training_pipeline(source: str = "json", file_path: str = None, mongo_client = None, chunk_size: int = None, number_of_epochs: int = None, min_f1_score: float = None) -> dict:
+    """
+    this function trains a model on a labeled dataset, evaluates it on the testing dataset and publishes it
+    if its weighted f1-score reaches the minimum score
+
+    Parameters
+    ----------
+    source : str, optional
+        the source of the labeled accounts, "json", "jsonl" or "mongodb". The default is "json".
+    file_path : str, optional
+        the path of the json or jsonl file. The default is None.
+    mongo_client : TYPE, optional
+        the mongo client to use instead of connecting to constants.MONGO_URI. The default is None.
+    chunk_size : int, optional
+        the number of accounts fitted at a time. The default is None which uses constants.TRAINING_CHUNK_SIZE.
+    number_of_epochs : int, optional
+        the number of passes over the dataset. The default is None which uses constants.TRAINING_EPOCHS.
+    min_f1_score : float, optional
+        the minimum weighted f1-score to publish the model. The default is None which uses constants.TRAINING_MIN_F1_SCORE.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the training parameters, the evaluation of the model, whether it was published and its version.
+
+    """
+    min_f1_score = min_f1_score if min_f1_score is not None else constants.TRAINING_MIN_F1_SCORE
+    training_start = time.perf_counter()
+    prediction_model, vectorizer, number_of_accounts = train_model(source, file_path, mongo_client, chunk_size, number_of_epochs)
+    training_summary = {"source": source,
+                        "file_path": file_path,
+                        "number_of_accounts": number_of_accounts,
+                        "chunk_size": chunk_size if chunk_size is not None else constants.TRAINING_CHUNK_SIZE,
+                        "number_of_epochs": number_of_epochs if number_of_epochs is not None else constants.TRAINING_EPOCHS,
+                        "training_seconds": time.perf_counter() - training_start,
+                        "evaluation": evaluate_model(prediction_model, vectorizer)}
+    training_summary["published"] = training_summary["evaluation"]["weighted_f1_score"] >= min_f1_score
+    training_summary["version"] = publish_model(prediction_model, vectorizer, training_summary) if training_summary["published"] else None
+    return training_summary
+
+
+if __name__ == "__main__":
+    #train and publish a model on the training dataset of the constants
+    print(json.dumps(run_training_pipeline(), indent=4))
@@ -0,0 +1,241 @@
+"""
+this script contains the parser that extracts the user data from the html of a medium profile page
+two backends are available: the fast C based lxml parser which reads the user data section in a single pass,
+and the beautifulsoup parser which is used when lxml is not installed.
+the tags and classes of the elements to extract are defined in constants.PAGE_SELECTORS
+"""
+import re
+import constants
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+#regular expressions used to extract the user ids of the following links and to find the see all following link
+FOLLOWING_AT_REGEX = re.compile(r'@(.*)?\?')
+FOLLOWING_SUBDOMAIN_REGEX = re.compile(r'https://(.*).medium')
+SEE_ALL_REGEX = re.compile('see all', re.I)
+
+
+def class_matches(class_attribute: str, selector_class: str) -> bool:
+    """
+    this function checks if the class attribute of an element matches the class of a selector,
+    either because it is the same string or because the element has the selector class among its classes like beautifulsoup does
+
+    Parameters
+    ----------
+    class_attribute : str
+        the class attribute of the element.
+    selector_class : str
+        the class of the selector.
+
+    Returns
+    -------
+    bool
+        True if the element matches the selector.
+
+    """
+    return class_attribute == selector_class or selector_class in class_attribute.split()
+
+
+def get_lxml_parser(html_content: bytes, encoding: str = None):
+    """
+    this function returns the lxml parser decoding the page with the charset sent by the server,
+    lxml decodes the pages without charset meta tag as latin-1 so the pages without charset are decoded as utf-8 when they are valid utf-8
+
+    Parameters
+    ----------
+    html_content : bytes
+        the html of the medium profile page.
+    encoding : str, optional
+        the charset of the Content-Type header of the page. The default is None.
+
+    Returns
+    -------
+    lxml.html.HTMLParser
+        the parser decoding the page, None to let lxml use the charset meta tag of the page.
+
+    """
+    if encoding is None:
+        try:
+            html_content.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+        encoding = "utf-8"
+    return lxml.html.HTMLParser(encoding=encoding)
+
+
+def extract_page_fields_lxml(html_content: bytes, encoding: str = None) -> dict:
+    """
+    this function extracts the raw fields of the user data section with lxml by going through the elements of the section a single time
+
+    Parameters
+    ----------
+    html_content : bytes
+        the html of the medium profile page.
+    encoding : str, optional
+        the charset of the Content-Type header of the page. The default is None.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the raw texts and links of the user data section.
+
+    """
+    sidebar_tag, sidebar_class = constants.PAGE_SELECTORS["sidebar"]
+    following_tag, following_class = constants.PAGE_SELECTORS["following_link"]
+    follower_tag, follower_class = constants.PAGE_SELECTORS["follower_count"]
+    name_tag, name_class = constants.PAGE_SELECTORS["author_name"]
+
+    #navigate to the right hand section of the medium page containing the user data
+    root = lxml.html.fromstring(html_content, parser=get_lxml_parser(html_content, encoding))
+    sidebar = next((element for element in root.iter(sidebar_tag) if class_matches(element.get("class", ""), sidebar_class)), None)
+    if sidebar is None:
+        raise ValueError("the user data section was not found in the page with the selectors version " + str(constants.PAGE_SELECTORS_VERSION))
+
+    fields = {"name": None, "followers_text": None, "following_hrefs": [], "has_see_all": False, "paragraphs": []}
+    for element in sidebar.iter():
+        tag = element.tag
+        #skip the comments and processing instructions
+        if not isinstance(tag, str):
+            continue
+        if tag == "p":
+            fields["paragraphs"].append(element)
+        if tag == following_tag and class_matches(element.get("class", ""), following_class) and element.find(".//h4") is not None:
+            fields["following_hrefs"].append(element.get("href"))
+        elif tag == follower_tag and fields["followers_text"] is None and class_matches(element.get("class", ""), follower_class):
+            fields["followers_text"] = element.text_content()
+        elif tag == name_tag and fields["name"] is None and class_matches(element.get("class", ""), name_class):
+            fields["name"] = element.text_content()
+        if tag == "a" and not fields["has_see_all"] and SEE_ALL_REGEX.search(element.text_content()):
+            fields["has_see_all"] = True
+
+    #the description is in the second paragraph of the section
+    description_paragraph = fields.pop("paragraphs")[1]
+    fields["description_text"] = description_paragraph.text_content()
+    fields["description_links"] = [description_link.get("href") for description_link in description_paragraph.iter("a")]
+    return fields
+
+
+def extract_page_fields_bs4(html_content: bytes, encoding: str = None) -> dict:
+    """
+    this function extracts the raw fields of the user data section with beautifulsoup
+
+    Parameters
+    ----------
+    html_content : bytes
+        the html of the medium profile page.
+    encoding : str, optional
+        the charset of the Content-Type header of the page. The default is None which lets beautifulsoup detect it.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the raw texts and links of the user data section.
+
+    """
+    #beautifulsoup is only imported when this backend is used so the processes parsing with lxml do not load it
+    from bs4 import BeautifulSoup
+    #parse the page content with beautifulsoup
+    soup = BeautifulSoup(html_content, 'html.parser', from_encoding=encoding)
+    #navigate to the right hand section of the medium page containing the user data
+    user_soup = soup.find(constants.PAGE_SELECTORS["sidebar"][0], class_=constants.PAGE_SELECTORS["sidebar"][1])
+    if user_soup is None:
+        raise ValueError("the user data section was not found in the page with the selectors version " + str(constants.PAGE_SELECTORS_VERSION))
+
+    following_tag, following_class = constants.PAGE_SELECTORS["following_link"]
+    #the description is in the second paragraph of the section
+    description_paragraph = user_soup.findAll('p')[1]
+    return {"name": user_soup.find(constants.PAGE_SELECTORS["author_name"][0], class_=constants.PAGE_SELECTORS["author_name"][1]).text,
+            "followers_text": user_soup.find(constants.PAGE_SELECTORS["follower_count"][0], class_=constants.PAGE_SELECTORS["follower_count"][1]).text,
+            "following_hrefs": [following['href'] for following in user_soup.findAll(following_tag, class_=following_class) if following.find('h4')],
+            "has_see_all": user_soup.find('a', text=SEE_ALL_REGEX) is not None,
+            "description_text": description_paragraph.text,
+            "description_links": [description_link['href'] for description_link in description_paragraph.findAll('a')]}
+
+
+def get_following_user_id(following_href: str) -> str:
+    """
+    this function extracts the user id from a link to a followed account
+    the link can be formated as https://medium.com/@user_id?source=... or as https://user_id.medium.com
+
+    Parameters
+    ----------
+    following_href : str
+        the link to the followed account.
+
+    Returns
+    -------
+    str
+        the user id of the followed account or an empty string if the link has another format.
+
+    """
+    if "/@" in following_href:
+        return FOLLOWING_AT_REGEX.search(following_href).group(1)
+    if ".medium.com" in following_href:
+        return FOLLOWING_SUBDOMAIN_REGEX.search(following_href).group(1)
+    return ''
+
+
+def parse_medium_page(html_content: bytes, user_id: str, medium_link: str, parser_backend: str = None, encoding: str = None) -> dict:
+    """
+    this function extracts the user data of a medium profile page with the configured parser backend
+
+    Parameters
+    ----------
+    html_content : bytes
+        the html of the medium profile page.
+    user_id : str
+        the user id of the medium account.
+    medium_link : str
+        the link of the medium profile page.
+    parser_backend : str, optional
+        "lxml" or "bs4". The default is None which uses constants.PARSER_BACKEND.
+    encoding : str, optional
+        the charset of the Content-Type header of the page. The default is None which uses the charset meta tag of the page or utf-8.
+
+    Returns
+    -------
+    dict
+        dictionnary containing the user data.
+
+    """
+    if parser_backend is None:
+        parser_backend = constants.PARSER_BACKEND
+    if parser_backend == "lxml" and lxml is not None:
+        fields = extract_page_fields_lxml(html_content, encoding)
+    else:
+        fields = extract_page_fields_bs4(html_content, encoding)
+
+    #create the user_data dictionnary containing the scraped data
+    user_data = dict()
+    user_data["medium"] = user_id
+    user_data["name"] = fields["name"]
+
+    #format the number of followers by transforming numbers like 14k and 1.2M to an integer like 14000 and 12000000
+    nb_followers = fields["followers_text"].split(" ")[0]
+    if "M" in nb_followers:
+        user_data["num_followers"] = int(float(nb_followers.replace("M",""))*1000000)
+    elif "K" in nb_followers:
+        user_data["num_followers"] = int(float(nb_followers.replace("K",""))*1000)
+    else:
+        user_data["num_followers"] = int(nb_followers)
+
+    user_data["following_top_5"] = [get_following_user_id(following_href) for following_href in fields["following_hrefs"]]
+
+    #check if the user displays following data and if it is found form the standard all following link that follows this format https://medium.com/@user_id/following
+    user_data["all_following_link"] = ""
+    if fields["has_see_all"]:
+        user_data["all_following_link"] = medium_link + "/following"
+
+    #check if the user has a description to save
+    user_data["description"] = ""
+    if "See all (" not in fields["description_text"] and fields["description_text"] != "Help":
+        user_data["description"] = u"" + fields["description_text"]
+
+    #links inside the description
+    user_data["links_of_description"] = fields["description_links"]
+    #set the type tag to an empty string to fill it with a prediction or to manually label it later
+    user_data["type"] = ""
+    return user_data
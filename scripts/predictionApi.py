@@ -1,13 +1,62 @@
-import json, typing
-from fastapi import FastAPI
+import json, typing, asyncio, functools, time, logging
+import constants
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request
+from pydantic import BaseModel
 from mediumScraper import predict_medium_account
-from mediumScraper import collect_medium_accounts
+from mediumScraper import predict_medium_accounts
+from mediumScraper import iter_medium_accounts
 from mediumScraper import get_medium_page_data
 from mediumScraper import account_is_in_trainingdataset
-from starlette.responses import Response
+from modelRegistry import load_model, get_model_info, prediction_cache
+from profileCache import get_cache_stats
+from trainingIndex import get_training_id_set
+from logHandling import get_function_metrics, render_metrics
+from starlette.responses import Response, StreamingResponse
+
+#orjson serializes the responses several times faster than the json module, json is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 app = FastAPI()
 
+class BatchPredictionRequest(BaseModel):
+    descriptions: typing.List[str] = []
+    user_ids: typing.List[str] = []
+    with_probability: bool = False
+
+class TrainingDataRequest(BaseModel):
+    user_ids: typing.List[str] = []
+
+def dump_json(content: typing.Any) -> bytes:
+    """
+    function that serializes content to compact utf-8 json, with orjson when it is installed
+
+    Parameters
+    ----------
+    content : typing.Any
+        the content to serialize.
+
+    Returns
+    -------
+    bytes
+        the json without indentation or spaces between the items.
+
+    """
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class CompactJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: typing.Any) -> bytes:
+        return dump_json(content)
+
+
 class PrettyJSONResponse(Response):
     media_type = "application/json"
 
@@ -21,36 +70,267 @@ class PrettyJSONResponse(Response):
         ).encode("utf-8")
 
 
+def json_response(content: typing.Any, pretty: bool = False, status_code: int = 200) -> Response:
+    """
+    function that returns the json response of a route, compact by default and indented when the client asks for it with ?pretty=true
+
+    Parameters
+    ----------
+    content : typing.Any
+        the content of the response.
+    pretty : bool, optional
+        True to indent the json. The default is False.
+    status_code : int, optional
+        the status code of the response. The default is 200.
+
+    Returns
+    -------
+    Response
+        a CompactJSONResponse or a PrettyJSONResponse.
+
+    """
+    if pretty:
+        return PrettyJSONResponse(content, status_code=status_code)
+    return CompactJSONResponse(content, status_code=status_code)
+
+
+#bounded thread pools running the blocking work so the event loop stays free to answer the other clients
+#crawls and batches get their own pools so they can never use all the threads scraping single accounts
+scraping_executor = ThreadPoolExecutor(max_workers=constants.API_SCRAPING_WORKERS, thread_name_prefix="scraping")
+batch_scraping_executor = ThreadPoolExecutor(max_workers=constants.API_BATCH_SCRAPING_WORKERS, thread_name_prefix="batch-scraping")
+prediction_executor = ThreadPoolExecutor(max_workers=constants.API_PREDICTION_WORKERS, thread_name_prefix="prediction")
+crawl_executor = ThreadPoolExecutor(max_workers=constants.API_CRAWL_WORKERS, thread_name_prefix="crawl")
+
+#scrapes currently running for each user id, shared by the concurrent requests asking for the same user
+in_flight_scrapes = dict()
+
+
+async def run_in_executor(executor: ThreadPoolExecutor, func, *args, **kwargs):
+    """
+    function that runs a blocking function in one of the thread pools and waits for its result without blocking the event loop
+
+    Parameters
+    ----------
+    executor : ThreadPoolExecutor
+        the thread pool to run the function in.
+    func : TYPE
+        the blocking function to run.
+
+    Returns
+    -------
+    TYPE
+        the value returned by the function.
+
+    """
+    return await asyncio.get_running_loop().run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+def start_scrape(user_id: str) -> asyncio.Future:
+    """
+    function that starts the scrape of a medium user in the scraping thread pool.
+    concurrent requests for the same user id wait for the same scrape instead of sending one request each to medium
+
+    Parameters
+    ----------
+    user_id : str
+        medium user id to scrape.
+
+    Returns
+    -------
+    asyncio.Future
+        the future of the scrape returning the json data of the medium user or None if the scraping failed.
+
+    """
+    scrape_future = in_flight_scrapes.get(user_id)
+    if scrape_future is None:
+        scrape_future = asyncio.ensure_future(run_in_executor(scraping_executor, get_medium_page_data, user_id))
+        in_flight_scrapes[user_id] = scrape_future
+        scrape_future.add_done_callback(lambda _: in_flight_scrapes.pop(user_id, None))
+    return scrape_future
+
+
+async def scrape_user(user_id: str) -> str:
+    """
+    function that scrapes a medium user in the scraping thread pool and waits at most constants.API_REQUEST_TIMEOUT seconds
+
+    Parameters
+    ----------
+    user_id : str
+        medium user id to scrape.
+
+    Returns
+    -------
+    str
+        string containing the json data of the medium user or None if the scraping failed.
+
+    """
+    #shield the shared scrape so a request reaching its timeout does not cancel it for the other requests
+    return await asyncio.wait_for(asyncio.shield(start_scrape(user_id)), constants.API_REQUEST_TIMEOUT)
+
+
+async def scrape_users(user_ids: list) -> list:
+    """
+    function that scrapes many medium users in the batch scraping thread pool with one deadline for the whole batch.
+    the batches have their own pool and do not register their scrapes as in flight, so the requests for single users never wait behind a batch.
+    the requests sent to medium are rate limited so the deadline grows with the number of users:
+    constants.API_REQUEST_TIMEOUT seconds plus the time needed to send one request per user at constants.CRAWLER_REQUESTS_PER_SECOND.
+    the scrapes that have not started at the deadline are cancelled
+
+    Parameters
+    ----------
+    user_ids : list
+        medium user ids to scrape.
+
+    Returns
+    -------
+    list
+        the json data of every medium user in the order of the user ids, None for the users that could not be scraped before the deadline.
+
+    """
+    if not user_ids:
+        return []
+    #one scrape per user id of the batch, joining the scrape of a single user request when one is running
+    scrape_futures = dict()
+    batch_futures = []
+    for user_id in user_ids:
+        if user_id in scrape_futures:
+            continue
+        scrape_futures[user_id] = in_flight_scrapes.get(user_id)
+        if scrape_futures[user_id] is None:
+            scrape_futures[user_id] = asyncio.wrap_future(batch_scraping_executor.submit(get_medium_page_data, user_id))
+            batch_futures.append(scrape_futures[user_id])
+    batch_timeout = constants.API_REQUEST_TIMEOUT + len(scrape_futures) / constants.CRAWLER_REQUESTS_PER_SECOND
+    await asyncio.wait(scrape_futures.values(), timeout=batch_timeout)
+    #cancelling a wrapped future cancels its scrape if it has not started, the running scrapes finish and fill the profile cache
+    for batch_future in batch_futures:
+        batch_future.cancel()
+    return [scrape_futures[user_id].result() if scrape_futures[user_id].done() and not scrape_futures[user_id].cancelled() else None for user_id in user_ids]
+
+
+async def crawl_accounts(user_id: str, number_of_users: int):
+    """
+    async generator that runs the crawl of iter_medium_accounts in the crawl thread pool one account at a time
+    and yields every account as soon as it is scraped and predicted.
+    asyncio.TimeoutError is raised when the crawl has been running for more than constants.API_CRAWL_TIMEOUT seconds,
+    the crawl is then stopped after the step running in its thread so it does not keep a thread of the crawl pool
+
+    Parameters
+    ----------
+    user_id : str
+        medium user id to start scraping data and predict with.
+    number_of_users : int
+        number of user to be returned.
+
+    Yields
+    ------
+    dict
+        the data of the next account of the crawl.
+
+    """
+    account_iterator = iter_medium_accounts(user_id, number_of_users, True)
+    deadline = time.monotonic() + constants.API_CRAWL_TIMEOUT
+    step_future = None
+    try:
+        while True:
+            step_future = crawl_executor.submit(next, account_iterator, None)
+            account_data = await asyncio.wait_for(asyncio.wrap_future(step_future), deadline - time.monotonic())
+            if account_data is None:
+                return
+            yield account_data
+    finally:
+        #closing the generator stops the scraping pool of the crawl so it is always closed in the crawl thread pool and never on the event loop,
+        #a generator cannot be closed while a thread is running it so it is closed once the last step is over
+        if step_future is None:
+            crawl_executor.submit(account_iterator.close)
+        else:
+            step_future.add_done_callback(lambda _: crawl_executor.submit(account_iterator.close))
+
+
+@app.exception_handler(asyncio.TimeoutError)
+async def timeout_handler(request: Request, exception: asyncio.TimeoutError):
+    """
+    function that answers the requests that took longer than their timeout
+
+    Returns
+    -------
+    Response
+        Json containing the error message with a 504 status code.
+
+    """
+    pretty = request.query_params.get("pretty", "").lower() in ("1", "true", "yes", "on")
+    return json_response({"message": "the request took longer than the timeout of the api and was stopped"}, pretty, status_code=504)
+
+
+def unscraped_user_response(user_id: str, pretty: bool = False) -> Response:
+    """
+    function that returns the response sent when a medium user could not be scraped
+
+    Parameters
+    ----------
+    user_id : str
+        medium user id that could not be scraped.
+    pretty : bool, optional
+        True to indent the json. The default is False.
+
+    Returns
+    -------
+    Response
+        Json containing the medium id and the error message with a 502 status code.
+
+    """
+    return json_response({"medium": user_id, "message": "the medium account could not be scraped"}, pretty, status_code=502)
+
+
+@app.on_event("startup")
+def load_prediction_model():
+    """
+    function that loads the prediction model and the training index in memory when the api starts so the first request does not pay for it
+
+    Returns
+    -------
+    None.
+
+    """
+    load_model()
+    get_training_id_set()
+
+
 @app.get("/")
-def home():
+async def home(pretty: bool = False):
     """
 
     Returns
     -------
-    PrettyJSONResponse
+    Response
         returns a json containing the message of the api's default route.
 
     """
-    return PrettyJSONResponse({"message":"Welcome to the medium prediction api go to /routes to check the available options"})
+    return json_response({"message":"Welcome to the medium prediction api go to /routes to check the available options"}, pretty)
 
 
 @app.get("/routes")
-def get_routes():
+async def get_routes(pretty: bool = False):
     """
 
     Returns
     -------
-    PrettyJSONResponse
+    Response
         returns a Json containing the available routes of the api.
 
     """
-    return PrettyJSONResponse({"/predictMediumUser/quartz?with_data=True": "predict 1 user using user id like BessemerVP and an optional parameter with_data set by default to True to display data or False for the prediction only",
-                               "/predictUsersStartingWith/{user_id}/{number_of_users}": "predict multiple users that are not part of the training dataset starting with user_id like BessemerVP and a number_of_users like 5",
-                               "/checkTrainingData/{user_id}": "check if account with user_id is in the model training dataset"})
+    return json_response({"/predictMediumUser/quartz?with_data=True": "predict 1 user using user id like BessemerVP and an optional parameter with_data set by default to True to display data or False for the prediction only",
+                          "/predictUsersStartingWith/{user_id}/{number_of_users}?stream=ndjson": "predict multiple users that are not part of the training dataset starting with user_id like BessemerVP and a number_of_users like 5, with an optional parameter stream set to ndjson or sse to receive every account as soon as it is scraped",
+                          "/checkTrainingData/{user_id}": "check if account with user_id is in the model training dataset",
+                          "/checkTrainingData": "POST a json body with a list of user_ids to check which accounts are in the model training dataset",
+                          "/predictBatch": "POST a json body with a list of descriptions and/or a list of user_ids to predict many accounts in one call",
+                          "/cacheStats": "return the hit and miss counters of the scraped profiles cache and of the predictions memo",
+                          "/metrics": "return the number of calls, errors and latency histograms of the scraping and prediction functions in the prometheus format (?format=json for json)",
+                          "/modelInfo": "return the version and load time of the prediction model loaded in memory",
+                          "?pretty=true": "add pretty=true to the parameters of any route to receive an indented json instead of the compact json"}, pretty)
 
 
 @app.get("/checkTrainingData/{user_id}")
-def account_is_in_training_set(user_id: str):
+async def account_is_in_training_set(user_id: str, pretty: bool = False):
     """
     function that takes in the user id and returns whether the account was used in the training dataset or not
 
@@ -58,20 +338,45 @@ def account_is_in_training_set(user_id: str):
     ----------
     user_id : str
         user id of the account.
+    pretty : bool, optional
+        true to indent the json response. The default is False.
 
     Returns
     -------
-    PrettyJSONResponse
+    Response
         Json containing the medium id and a boolean true or false that defines if the user is part of the tranining dataset.
 
     """
-    return PrettyJSONResponse({"medium": user_id, "is_in_training_dataset": account_is_in_trainingdataset(user_id)})
+    return json_response({"medium": user_id, "is_in_training_dataset": account_is_in_trainingdataset(user_id)}, pretty)
+
+
+@app.post("/checkTrainingData")
+async def accounts_are_in_training_set(training_data_request: TrainingDataRequest, pretty: bool = False):
+    """
+    function that takes a list of user ids and returns for each one whether the account was used in the training dataset or not
+
+    Parameters
+    ----------
+    training_data_request : TrainingDataRequest
+        body containing the list of user ids to check.
+    pretty : bool, optional
+        true to indent the json response. The default is False.
+
+    Returns
+    -------
+    Response
+        Json containing the medium id and a boolean true or false for every user id in the order they were sent.
+
+    """
+    training_id_set = get_training_id_set()
+    return json_response([{"medium": user_id, "is_in_training_dataset": user_id in training_id_set} for user_id in training_data_request.user_ids], pretty)
 
 
 @app.get("/predictMediumUser/{user_id}")
-def predict_user(user_id: str, with_data: bool = True):
+async def predict_user(user_id: str, with_data: bool = True, pretty: bool = False):
     """
     function that predicts if the user is a person or a company and can return all the scraped account data of the given medium user
+    the scraping and the prediction run in the thread pools of the api and the request is stopped after constants.API_REQUEST_TIMEOUT seconds
 
     Parameters
     ----------
@@ -79,26 +384,100 @@ def predict_user(user_id: str, with_data: bool = True):
         medium user id to scrape and predict.
     with_data : bool, optional
         true to return all the scraped data of the medium user, false to return the prediction only. The default is True.
+    pretty : bool, optional
+        true to indent the json response. The default is False.
 
     Returns
     -------
-    PrettyJSONResponse
+    Response
         Json of the prediction the medium user id and optionally the scraped data.
 
     """
+    user_data_json = await scrape_user(user_id)
+    if not isinstance(user_data_json, str):
+        return unscraped_user_response(user_id, pretty)
+    user_data_dict = json.loads(user_data_json)
+    predicted_type = await run_in_executor(prediction_executor, predict_medium_account, "None", user_data_dict["description"])
     if(with_data):
-        print(get_medium_page_data(user_id))
-        user_data_dict = json.loads(get_medium_page_data(user_id))
-        user_data_dict["type"] = predict_medium_account("None", user_data_dict["description"])
-        return PrettyJSONResponse(user_data_dict)
+        user_data_dict["type"] = predicted_type
+        return json_response(user_data_dict, pretty)
     else:
-        return PrettyJSONResponse({"medium": user_id, "type": predict_medium_account(user_id)})
+        return json_response({"medium": user_id, "type": predicted_type}, pretty)
+
+def format_stream_event(event: str, content: dict, stream_format: str) -> str:
+    """
+    function that formats the last message of a stream that did not end with a completed crawl,
+    as a json line with an "event" key for the ndjson format or as a named server-sent event for the sse format
+
+    Parameters
+    ----------
+    event : str
+        "error" or "timeout".
+    content : dict
+        the content of the message.
+    stream_format : str
+        "ndjson" or "sse".
+
+    Returns
+    -------
+    str
+        the formatted message.
+
+    """
+    if stream_format == "sse":
+        return "event: " + event + "\ndata: " + dump_json(content).decode("utf-8") + "\n\n"
+    event_content = {"event": event}
+    event_content.update(content)
+    return dump_json(event_content).decode("utf-8") + "\n"
+
+
+async def stream_accounts(user_id: str, number_of_users: int, stream_format: str):
+    """
+    async generator that crawls the medium accounts in the crawl thread pool and sends every account as soon as it is scraped and predicted,
+    as one json line for the ndjson format or as one server-sent event for the sse format.
+    the stream ends when the crawl is over, or with an error message when the first account could not be scraped or the crawl failed,
+    or with a timeout message when it has been running for more than constants.API_CRAWL_TIMEOUT seconds
+
+    Parameters
+    ----------
+    user_id : str
+        medium user id to start scraping data and predict with.
+    number_of_users : int
+        number of user to be returned.
+    stream_format : str
+        "ndjson" or "sse".
+
+    Yields
+    ------
+    str
+        the formatted account.
+
+    """
+    number_sent = 0
+    try:
+        async for account_data in crawl_accounts(user_id, number_of_users):
+            account_line = dump_json(account_data).decode("utf-8")
+            yield ("data: " + account_line + "\n\n") if stream_format == "sse" else (account_line + "\n")
+            number_sent += 1
+    except asyncio.TimeoutError:
+        yield format_stream_event("timeout", {"message": "the crawl took longer than the timeout of the api and was stopped", "number_of_accounts": number_sent}, stream_format)
+        return
+    except Exception as exception:
+        #the status of the streaming response has already been sent, the error is reported in the stream
+        logging.error("stream_accounts: the crawl starting from " + str(user_id) + " failed with message: " + str(exception), exc_info=True)
+        yield format_stream_event("error", {"medium": user_id, "message": "the crawl failed", "number_of_accounts": number_sent}, stream_format)
+        return
+    #the first account of a crawl is always sent, the crawl stops without accounts when it could not be scraped
+    if number_sent == 0:
+        yield format_stream_event("error", {"medium": user_id, "message": "the medium account could not be scraped", "number_of_accounts": 0}, stream_format)
+
 
 @app.get("/predictUsersStartingWith/{user_id}/{number_of_users}")
-def predict_multiple_users(user_id: str, number_of_users: int):
+async def predict_multiple_users(user_id: str, number_of_users: int, stream: str = None, pretty: bool = False):
     """
     function that returns the prediction and scraped data of multiple medium users 
     starting with a provided medium user id and searching for a number of users provided in the parameters
+    the crawl runs in its own thread pool and the request is stopped after constants.API_CRAWL_TIMEOUT seconds
 
     Parameters
     ----------
@@ -106,11 +485,118 @@ def predict_multiple_users(user_id: str, number_of_users: int):
         medium user id to start scraping data and predict with.
     number_of_users : int
         number of user to be returned.
+    stream : str, optional
+        "ndjson" or "sse" to stream every account as soon as it is scraped instead of waiting for the whole crawl. The default is None.
+    pretty : bool, optional
+        true to indent the json response. The default is False.
+
+    Returns
+    -------
+    Response
+        Json containing the scraped medium accounts and the predictions, or a streaming response of the accounts.
+
+    """
+    if number_of_users < 1:
+        return json_response({"message": "provide a number greater than 0"}, pretty, status_code=400)
+    if stream == "ndjson":
+        return StreamingResponse(stream_accounts(user_id, number_of_users, stream), media_type="application/x-ndjson")
+    if stream == "sse":
+        return StreamingResponse(stream_accounts(user_id, number_of_users, stream), media_type="text/event-stream")
+    
+    #the timeout error of the crawl is answered with a 504 by timeout_handler
+    account_data_list = [account_data async for account_data in crawl_accounts(user_id, number_of_users)]
+    #the first account of a crawl is always returned, the crawl stops without accounts when it could not be scraped
+    if not account_data_list:
+        return unscraped_user_response(user_id, pretty)
+    return json_response(account_data_list, pretty)
+
+
+@app.post("/predictBatch")
+async def predict_batch(batch_request: BatchPredictionRequest, pretty: bool = False):
+    """
+    function that predicts the type of many accounts at once using one vectorized prediction for the whole batch.
+    the accounts can be given by their descriptions directly or by their user ids which will be scraped first
+
+    Parameters
+    ----------
+    batch_request : BatchPredictionRequest
+        body containing the list of descriptions, the list of user ids and whether to return the probabilities.
+    pretty : bool, optional
+        true to indent the json response. The default is False.
+
+    Returns
+    -------
+    Response
+        Json containing the predictions of the descriptions and of the user ids in the order they were sent.
+
+    """
+    #scrape the descriptions of the user ids concurrently, accounts that could not be scraped before the deadline are predicted with an empty description
+    scraped_accounts = await scrape_users(batch_request.user_ids)
+    user_descriptions = [json.loads(account_json)["description"] if isinstance(account_json, str) else "" for account_json in scraped_accounts]
+    
+    predictions = await run_in_executor(prediction_executor, predict_medium_accounts, batch_request.descriptions + user_descriptions, batch_request.with_probability)
+    number_of_descriptions = len(batch_request.descriptions)
+    
+    def format_prediction(key: str, value: str, prediction) -> dict:
+        prediction_dict = {key: value}
+        prediction_dict.update(prediction if isinstance(prediction, dict) else {"type": prediction})
+        return prediction_dict
+    
+    return json_response({"descriptions": [format_prediction("description", description, prediction) for description, prediction in zip(batch_request.descriptions, predictions[:number_of_descriptions])],
+                          "user_ids": [format_prediction("medium", user_id, prediction) if isinstance(account_json, str) else {"medium": user_id, "type": None}
+                                       for user_id, account_json, prediction in zip(batch_request.user_ids, scraped_accounts, predictions[number_of_descriptions:])]}, pretty)
+
+
+@app.get("/modelInfo")
+async def model_info(pretty: bool = False):
+    """
+    function that returns the information of the prediction model currently loaded in memory
+
+    Returns
+    -------
+    Response
+        Json containing the model version, load time and the files it was loaded from.
+
+    """
+    #loading the model can unpickle new model files so it runs in the prediction thread pool
+    await run_in_executor(prediction_executor, load_model)
+    return json_response(get_model_info(), pretty)
+
+
+@app.get("/cacheStats")
+async def cache_stats(pretty: bool = False):
+    """
+    function that returns the hit and miss counters of the scraped profiles cache and of the predictions memo
+
+    Returns
+    -------
+    Response
+        Json containing the stats of the memory and disk tiers of the profiles cache and the stats of the predictions memo.
+
+    """
+    cache_stats_dict = get_cache_stats()
+    cache_stats_dict["predictions"] = prediction_cache.get_stats()
+    return json_response(cache_stats_dict, pretty)
+
+
+@app.get("/metrics")
+async def metrics(format: str = "prometheus", pretty: bool = False):
+    """
+    function that returns the number of calls, the number of errors and the latency histograms of the functions decorated by the exception handler
+
+    Parameters
+    ----------
+    format : str, optional
+        "prometheus" for the prometheus text format or "json". The default is "prometheus".
+    pretty : bool, optional
+        true to indent the json response. The default is False.
 
     Returns
     -------
-    PrettyJSONResponse
-        Json containing the scraped medium accounts and the predictions.
+    Response
+        the metrics in the prometheus text format or a json containing the metrics of every function.
 
     """
-    return PrettyJSONResponse(json.loads(collect_medium_accounts(user_id, number_of_users, True)))
\ No newline at end of file
+    if format == "json":
+        return json_response(get_function_metrics(), pretty)
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4")
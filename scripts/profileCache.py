@@ -0,0 +1,310 @@
+"""
+this script contains the cache placed in front of the scraper so popular accounts are not scraped again on every request
+the scraped profiles are kept in an in-memory LRU tier and optionally in an on-disk sqlite tier, both expiring after a TTL
+"""
+import sqlite3
+import threading
+import time
+import constants
+
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    thread safe in-memory cache that evicts the least recently used entries when full and expires entries older than the ttl
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        this function returns the value stored for the key or None if it is missing or expired
+
+        Parameters
+        ----------
+        key : TYPE
+            the key of the entry.
+
+        Returns
+        -------
+        TYPE
+            the cached value or None.
+
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (self.ttl_seconds is None or time.time() - entry[1] < self.ttl_seconds):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, stored_at: float = None):
+        """
+        this function stores the value of the key and evicts the least recently used entries if the cache is full
+
+        Parameters
+        ----------
+        key : TYPE
+            the key of the entry.
+        value : TYPE
+            the value to cache.
+        stored_at : float, optional
+            the timestamp the value was produced at, used to compute its expiry. The default is None which means now.
+
+        Returns
+        -------
+        None.
+
+        """
+        with self.lock:
+            self.entries[key] = (value, time.time() if stored_at is None else stored_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        this function removes all the entries of the cache
+
+        Returns
+        -------
+        None.
+
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        this function returns the hit and miss counters of the cache
+
+        Returns
+        -------
+        dict
+            dictionnary containing the hits, misses, hit rate and number of entries.
+
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0, "size": len(self.entries), "max_size": self.max_size}
+
+
+class SqliteCache:
+    """
+    on-disk cache tier storing the profiles in a sqlite table, evicting the least recently used rows in batches when it grows over its maximum size.
+    the access times of the hits are kept in memory and written in one transaction every access_flush_size hits or before an eviction,
+    so reading a cached profile does not write to the disk
+    """
+
+    def __init__(self, database_path: str, max_entries: int, ttl_seconds: float, eviction_batch_size: int = None, access_flush_size: int = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.eviction_batch_size = max(1, eviction_batch_size if eviction_batch_size is not None else constants.PROFILE_CACHE_DB_EVICTION_BATCH)
+        self.access_flush_size = access_flush_size if access_flush_size is not None else constants.PROFILE_CACHE_DB_ACCESS_FLUSH_SIZE
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        #access times of the hits not written to the table yet keyed by user id
+        self.pending_accesses = dict()
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        #the write-ahead log lets a commit append to the log instead of rewriting the pages of the table
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS profiles (user_id TEXT PRIMARY KEY, data TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS profiles_accessed_at ON profiles (accessed_at)")
+        self.connection.commit()
+        #number of rows of the table, counted once so the inserts do not have to count them
+        self.size = self.connection.execute("SELECT COUNT(*) FROM profiles").fetchone()[0]
+
+    def flush_accesses(self):
+        """
+        this function writes the pending access times of the hits to the table, the lock must be held by the caller
+
+        Returns
+        -------
+        None.
+
+        """
+        if self.pending_accesses:
+            self.connection.executemany("UPDATE profiles SET accessed_at = ? WHERE user_id = ?", [(accessed_at, key) for key, accessed_at in self.pending_accesses.items()])
+            self.connection.commit()
+            self.pending_accesses.clear()
+
+    def get(self, key: str):
+        """
+        this function returns the profile stored for the user id and the time it was stored at, or None if it is missing or expired
+
+        Parameters
+        ----------
+        key : str
+            the user id of the profile.
+
+        Returns
+        -------
+        tuple
+            the cached profile and the timestamp it was stored at, or None.
+
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT data, stored_at FROM profiles WHERE user_id = ?", (key,)).fetchone()
+            if row is not None and time.time() - row[1] < self.ttl_seconds:
+                self.pending_accesses[key] = time.time()
+                if len(self.pending_accesses) >= self.access_flush_size:
+                    self.flush_accesses()
+                self.hits += 1
+                return row
+            if row is not None:
+                self.connection.execute("DELETE FROM profiles WHERE user_id = ?", (key,))
+                self.connection.commit()
+                self.pending_accesses.pop(key, None)
+                self.size -= 1
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """
+        this function stores the profile of the user id. when the table grows over its maximum size the least recently used profiles
+        are evicted in one batch of eviction_batch_size rows, so the eviction query only runs once every eviction_batch_size inserts
+
+        Parameters
+        ----------
+        key : str
+            the user id of the profile.
+        value : str
+            the json data of the profile.
+
+        Returns
+        -------
+        None.
+
+        """
+        now = time.time()
+        with self.lock:
+            is_new_profile = self.connection.execute("SELECT 1 FROM profiles WHERE user_id = ?", (key,)).fetchone() is None
+            self.connection.execute("INSERT OR REPLACE INTO profiles (user_id, data, stored_at, accessed_at) VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self.pending_accesses.pop(key, None)
+            self.size += is_new_profile
+            if self.size > self.max_entries:
+                #the access times of the hits must be written before choosing the least recently used profiles
+                self.flush_accesses()
+                #the batch is at most a tenth of the table so small caches are not emptied
+                number_to_evict = self.size - self.max_entries + min(self.eviction_batch_size, self.max_entries // 10)
+                deleted_rows = self.connection.execute("DELETE FROM profiles WHERE user_id IN (SELECT user_id FROM profiles ORDER BY accessed_at LIMIT ?)", (number_to_evict,)).rowcount
+                self.size -= deleted_rows
+            self.connection.commit()
+
+    def get_stats(self) -> dict:
+        """
+        this function returns the hit and miss counters of the on-disk tier
+
+        Returns
+        -------
+        dict
+            dictionnary containing the hits, misses, hit rate and number of stored profiles.
+
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0, "size": self.size, "max_size": self.max_entries}
+
+
+#in-memory tier of the profile cache
+memory_cache = LRUCache(constants.PROFILE_CACHE_SIZE, constants.PROFILE_CACHE_TTL_SECONDS)
+
+#on-disk tier of the profile cache, opened on first use if a database is configured in the constants
+disk_cache = None
+disk_cache_lock = threading.Lock()
+
+
+def get_disk_cache():
+    """
+    this function opens the on-disk tier of the cache the first time it is needed
+
+    Returns
+    -------
+    SqliteCache
+        the on-disk cache or None if no database is configured.
+
+    """
+    global disk_cache
+    if constants.PROFILE_CACHE_DB is None:
+        return None
+    with disk_cache_lock:
+        if disk_cache is None:
+            disk_cache = SqliteCache(constants.PROFILE_CACHE_DB, constants.PROFILE_CACHE_DB_MAX_ENTRIES, constants.PROFILE_CACHE_TTL_SECONDS)
+        return disk_cache
+
+
+def get_profile(user_id: str) -> str:
+    """
+    this function returns the cached json data of a user from the memory tier, then from the disk tier
+
+    Parameters
+    ----------
+    user_id : str
+        the user id of the medium account.
+
+    Returns
+    -------
+    str
+        the json data of the medium user or None if it is not cached.
+
+    """
+    profile_json = memory_cache.get(user_id)
+    if profile_json is not None:
+        return profile_json
+    sqlite_cache = get_disk_cache()
+    if sqlite_cache is not None:
+        row = sqlite_cache.get(user_id)
+        if row is not None:
+            #promote the profile to the memory tier keeping its original age so it expires at the same time
+            memory_cache.set(user_id, row[0], row[1])
+            return row[0]
+    return None
+
+
+def set_profile(user_id: str, profile_json: str):
+    """
+    this function stores the json data of a user in every tier of the cache
+
+    Parameters
+    ----------
+    user_id : str
+        the user id of the medium account.
+    profile_json : str
+        the scraped json data of the medium user.
+
+    Returns
+    -------
+    None.
+
+    """
+    memory_cache.set(user_id, profile_json)
+    sqlite_cache = get_disk_cache()
+    if sqlite_cache is not None:
+        sqlite_cache.set(user_id, profile_json)
+
+
+def get_cache_stats() -> dict:
+    """
+    this function returns the hit and miss counters of every tier of the cache
+
+    Returns
+    -------
+    dict
+        dictionnary containing the stats of the memory tier and of the disk tier when it is configured.
+
+    """
+    sqlite_cache = get_disk_cache()
+    return {"memory": memory_cache.get_stats(), "disk": sqlite_cache.get_stats() if sqlite_cache is not None else None}
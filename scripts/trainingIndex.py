@@ -0,0 +1,39 @@
+"""
+this script contains the membership index of the accounts of the training dataset
+the index is a frozenset of medium ids built once per process and rebuilt only when the training dataset file changes on disk
+"""
+import os
+import json
+import threading
+import constants
+
+#lock that prevents two threads from building the index at the same time
+index_lock = threading.Lock()
+
+#dictionnary holding the set of training medium ids and the modification time of the file it was built from
+training_index_data = {"training_id_set": frozenset(), "mtime": None}
+
+
+def get_training_id_set() -> frozenset:
+    """
+    this function returns the set of the medium ids of the training dataset, parsing the training file only when it has changed
+
+    Returns
+    -------
+    frozenset
+        the medium ids of the accounts in the training dataset.
+
+    """
+    mtime = os.stat(constants.TRAINING_DATA_JSON).st_mtime_ns
+    #fast path: the index is still up to date so no lock is needed
+    if training_index_data["mtime"] == mtime:
+        return training_index_data["training_id_set"]
+
+    with index_lock:
+        #another thread may have rebuilt the index while this one was waiting for the lock
+        if training_index_data["mtime"] != mtime:
+            with open(constants.TRAINING_DATA_JSON, "r") as file:
+                training_data_json = json.loads(file.read())
+            training_index_data["training_id_set"] = frozenset(training_account["medium"] for training_account in training_data_json)
+            training_index_data["mtime"] = mtime
+        return training_index_data["training_id_set"]